@@ -1,6 +1,4 @@
 #!/usr/bin/env bash
-set -e
-set -x
-
-# download but through away
-wget -e robots=off --delete-after --verbose --recursive --level 2 http://vsb.app.vis.one 
+echo "DEPRECATED: Use 'dokku run vsb flask warm-cache' instead."
+echo "See: flask warm-cache --help"
+exit 1
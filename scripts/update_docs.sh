@@ -1,4 +1,4 @@
 #!/usr/bin/env bash
 set -x
 
-ssh ubuntu@10.10.10.100 -t "sudo dokku run vsb flask update-docs '*' && sudo dokku run vsb flask clear-cache && sudo dokku run vsb flask create-zips"
+ssh ubuntu@10.10.10.100 -t "sudo dokku run vsb flask update-docs '*' && sudo dokku run vsb flask warm-cache && sudo dokku run vsb flask create-zips --split"
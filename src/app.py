@@ -1,48 +1,70 @@
+import functools
 import gzip
+import hashlib
+import hmac
 import json
+import math
 import os
+import random
 import re
 import shutil
+import struct
 import tarfile
+import tempfile
 import time
 import zipfile
-from collections import Counter, defaultdict
+import zlib
+from collections import Counter, defaultdict, deque
 from concurrent.futures import ThreadPoolExecutor
-from datetime import datetime
+from contextlib import contextmanager
+from datetime import datetime, timezone
 from pathlib import Path
-from urllib.parse import quote, unquote
+from urllib.parse import quote, unquote, urlencode
 
 import cleantext
 import click
-import frontmatter
-import markdown
 import pdfplumber
 import pdftotext
 import spacy
 from flask import (
     Flask,
+    Response,
     abort,
+    g,
+    has_request_context,
     jsonify,
     make_response,
     redirect,
     render_template,
     request,
     send_from_directory,
+    stream_with_context,
 )
 from flask_caching import Cache
 from flask_sqlalchemy import SQLAlchemy
 from flask_sqlalchemy.query import Query
 from pdf2image import convert_from_path
 from PIL import Image
-from sqlalchemy import func
+from sqlalchemy import and_, event, func, or_, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import deferred, selectinload, undefer
 from sqlalchemy.sql import text
 from sqlalchemy_searchable import SearchQueryMixin, make_searchable, sql_expressions
 from sqlalchemy_utils.types import TSVectorType
 
+import metrics
+from blog_posts import BlogIndex
+from cube import AnalyticsCube
+from precompressed import choose_encoding, compress_variants, decompress
+from report_coverage import Coverage
 from report_info import report_info
 
 app = Flask(__name__)
 
+# deployed git revision, set by dokku
+release = os.environ.get("GIT_REV", "")[:12]
+
 if app.debug:
     url = "postgresql+psycopg2://postgres:password@db:5432/postgres"
     time.sleep(10)
@@ -52,9 +74,16 @@ else:
     # Fix for SQLAlchemy 1.4+: replace postgres:// with postgresql://
     if url.startswith("postgres://"):
         url = url.replace("postgres://", "postgresql://", 1)
-    app.config["CACHE_TYPE"] = "redis"
+    # Redis with a small LRU in each worker in front, see tiered_cache.py
+    app.config["CACHE_TYPE"] = "tiered_cache.TieredCache"
     app.config["CACHE_REDIS_URL"] = os.environ["REDIS_URL"]
+    # the LRU of a worker is emptied when documents are added or removed
+    app.config["CACHE_VERSION"] = lambda: get_corpus_version()
+    app.config["CACHE_LOCAL_MAX_BYTES"] = 32 << 20
+    app.config["CACHE_OBSERVE"] = lambda *args: record_cache(*args)
     app.config["CACHE_DEFAULT_TIMEOUT"] = 60 * 60  # 1 hour
+    # entries of a previous release are never read again and expire, see `corpus_key_prefix`
+    app.config["CACHE_KEY_PREFIX"] = release + "/"
 
 app.config["SQLALCHEMY_DATABASE_URI"] = url
 
@@ -81,10 +110,18 @@ class Document(db.Model):
     jurisdiction = db.Column(db.String)
     file_url = db.Column(db.String, unique=True)
     num_pages = db.Column(db.Integer)
+    # sum of all token counts, set on ingest
+    num_tokens = db.Column(db.Integer)
+    # `ngram_count_version` the n-grams were counted with, None if they weren't
+    ngram_version = db.Column(db.Integer)
 
 
 class DocumentPage(db.Model):
     query_class = DocumentQuery
+    # single pages are looked up by document and page number
+    __table_args__ = (
+        db.Index("ix_document_page_document_page", "document_id", "page_number"),
+    )
 
     document_id = db.Column(db.Integer, db.ForeignKey("document.id"), nullable=False)
     document = db.relationship(
@@ -94,9 +131,20 @@ class DocumentPage(db.Model):
 
     id = db.Column(db.Integer, primary_key=True)
     page_number = db.Column(db.Integer)
-    content = db.Column(db.UnicodeText)
+    # the text columns are only loaded by the profiles below that ask for them
+    content = deferred(db.Column(db.UnicodeText))
     file_url = db.Column(db.String, unique=True)
-    search_vector = db.Column(TSVectorType("content"))
+    search_vector = deferred(db.Column(TSVectorType("content")))
+
+
+# Loading profiles for DocumentPage objects, every query of pages uses one of them.
+# Queries of single columns (`with_entities`, `db.session.query(DocumentPage.content)`)
+# don't need one.
+page_text_profile = (undefer(DocumentPage.content),)
+search_result_profile = (
+    undefer(DocumentPage.content),
+    selectinload(DocumentPage.document),
+)
 
 
 class TokenCount(db.Model):
@@ -109,8 +157,45 @@ class TokenCount(db.Model):
     count = db.Column(db.Integer)
 
 
+class NgramCount(db.Model):
+    """Frequency of a bigram or trigram of consecutive words in a document."""
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    document_id = db.Column(
+        db.Integer, db.ForeignKey("document.id"), nullable=False, index=True
+    )
+    document = db.relationship("Document", backref=db.backref("ngram_counts"), lazy=True)
+
+    ngram = db.Column(db.String, index=True)
+    count = db.Column(db.Integer)
+
+
+class CorpusTotal(db.Model):
+    """Aggregates per jurisdiction and year, updated when documents are added or removed."""
+
+    __table_args__ = (db.UniqueConstraint("jurisdiction", "year"),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    jurisdiction = db.Column(db.String, nullable=False)
+    year = db.Column(db.Integer, nullable=False)
+    num_docs = db.Column(db.Integer, nullable=False, default=0)
+    num_pages = db.Column(db.Integer, nullable=False, default=0)
+    num_tokens = db.Column(db.Integer, nullable=False, default=0)
+    # corpus version of the last change, for the cache keys of the reports
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+
 db.configure_mappers()  # very important!
 
+# `create_all` does not add columns to existing tables
+schema_migrations = [
+    "ALTER TABLE document ADD COLUMN IF NOT EXISTS num_tokens INTEGER",
+    "ALTER TABLE document ADD COLUMN IF NOT EXISTS ngram_version INTEGER",
+    "ALTER TABLE corpus_total ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 0",
+    "CREATE INDEX IF NOT EXISTS ix_document_page_document_page ON document_page (document_id, page_number)",
+]
+
 # Create parse_websearch function for SQLAlchemy-Searchable 2.0+
 with app.app_context():
     try:
@@ -122,6 +207,8 @@ with app.app_context():
 
     if app.debug:
         db.create_all()
+        for statement in schema_migrations:
+            db.session.execute(text(statement))
         db.session.commit()
 
 
@@ -129,6 +216,9 @@ DATA_DIR = Path("/data")
 PDF_DIR = DATA_DIR / "pdfs"
 ZIP_DIR = DATA_DIR / "zips"
 WORDPOS_DIR = DATA_DIR / "wordpos"
+TEXT_DIR = DATA_DIR / "texts"
+CUBE_DIR = DATA_DIR / "cube"
+CORPUS_VERSION_FILE = DATA_DIR / "corpus-version"
 
 jurisdictions = ["Bund"] + [
     l[1] for l in sorted(report_info["abr"], key=lambda x: x[1])
@@ -144,6 +234,59 @@ def count_tokens(texts):
     return c
 
 
+ngram_sizes = (2, 3)
+# increased when the counting changes, `count-ngrams` recounts documents of older versions
+ngram_count_version = 1
+
+
+def is_word(token):
+    return any(ch.isalnum() for ch in token)
+
+
+def count_ngrams(texts):
+    """Count bigrams and trigrams of words, tokenized like `count_tokens`.
+
+    N-grams do not span pages or punctuation, so they only match phrases whose
+    words directly follow each other.
+    """
+    c = Counter()
+    for d in nlp.tokenizer.pipe(texts):
+        tokens = [str(t).lower() for t in d]
+        words = [is_word(t) for t in tokens]
+        for n in ngram_sizes:
+            for i in range(len(tokens) - n + 1):
+                if all(words[i : i + n]):
+                    c[" ".join(tokens[i : i + n])] += 1
+    return c
+
+
+def query_ngram(q):
+    """The n-gram a quoted phrase like `"freie kameradschaft"` is counted as, None for any other query.
+
+    Unquoted words are matched anywhere on a page, not only next to each other.
+    """
+    q = q.strip()
+    if len(q) < 2 or q[0] != '"' or q[-1] != '"' or '"' in q[1:-1]:
+        return None
+    tokens = [str(t).lower() for t in nlp.tokenizer(q[1:-1])]
+    if len(tokens) not in ngram_sizes or not all(is_word(t) for t in tokens):
+        return None
+    return " ".join(tokens)
+
+
+def add_ngram_counts(doc, texts):
+    """Store the n-gram counts of a document, in one bulk insert, and mark it as counted."""
+    counts = count_ngrams(texts)
+    rows = [
+        {"document_id": doc.id, "ngram": ngram, "count": count}
+        for ngram, count in counts.items()
+    ]
+    if rows:
+        db.session.execute(NgramCount.__table__.insert(), rows)
+    # also set for documents without any n-gram, e.g. scans without text
+    doc.ngram_version = ngram_count_version
+
+
 # TODO: often there are news lines instead of hyphens betwen the words
 regex_join_words = re.compile(r"(?<=\S\S)-\s+(?=\S{2,})")
 
@@ -198,16 +341,23 @@ def extract_word_positions(pdf_path):
                 f.write(data)
 
 
-def get_highlight_boxes(file_url, search_tokens):
-    """Load word positions for a page and return bounding boxes for matching words."""
+def load_word_positions(file_url):
+    """Word positions of a page by the URL of its image, None if they were not extracted."""
     basename = Path(file_url).stem
     wordpos_path = WORDPOS_DIR / f"{basename}.json.gz"
 
     if not wordpos_path.exists():
-        return []
+        return None
 
     with gzip.open(wordpos_path, "rt", encoding="utf-8") as f:
-        data = json.loads(f.read())
+        return json.loads(f.read())
+
+
+def get_highlight_boxes(file_url, search_tokens):
+    """Load word positions for a page and return bounding boxes for matching words."""
+    data = load_word_positions(file_url)
+    if data is None:
+        return []
 
     lower_tokens = [t.lower() for t in search_tokens]
     boxes = []
@@ -248,6 +398,119 @@ def save_page_image(img, pdf_stem, page_index):
     return jpg_path
 
 
+def write_text_file(pdf_stem, texts):
+    """Save the full text of a report, plus a gzip copy for nginx' `gzip_static`."""
+    TEXT_DIR.mkdir(parents=True, exist_ok=True)
+    text = "\n\n\n".join(texts)
+    path = TEXT_DIR / f"{pdf_stem}.txt"
+    for dest, data in [
+        (path, text.encode("utf-8")),
+        (path.with_name(path.name + ".gz"), gzip.compress(text.encode("utf-8"), 9)),
+    ]:
+        tmp = dest.with_name(dest.name + ".tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, dest)
+
+
+def remove_text_file(pdf_stem):
+    for path in [TEXT_DIR / f"{pdf_stem}.txt", TEXT_DIR / f"{pdf_stem}.txt.gz"]:
+        path.unlink(missing_ok=True)
+
+
+def get_corpus_version():
+    """Counter increased whenever documents are added or removed, shared by all processes."""
+    try:
+        return int(CORPUS_VERSION_FILE.read_text())
+    except (FileNotFoundError, ValueError):
+        return 0
+
+
+def bump_corpus_version():
+    version = get_corpus_version() + 1
+    DATA_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = CORPUS_VERSION_FILE.with_name(CORPUS_VERSION_FILE.name + ".tmp")
+    tmp.write_text(str(version))
+    os.replace(tmp, CORPUS_VERSION_FILE)
+    return version
+
+
+def update_corpus_totals(doc, sign=1):
+    """Add a document to the totals of its jurisdiction and year, or remove it with `sign=-1`.
+
+    The totals are changed in the database, not read and written back, as
+    `import-data --ingest` adds documents of the same year in parallel.
+    """
+    increments = {
+        "num_docs": sign,
+        "num_pages": sign * (doc.num_pages or 0),
+        "num_tokens": sign * (doc.num_tokens or 0),
+    }
+    changes = {
+        # the version the corpus will have once the change is done
+        "version": get_corpus_version() + 1,
+        **{c: getattr(CorpusTotal, c) + n for c, n in increments.items()},
+    }
+    # empty rows are kept, their version tells mirrors about the removal, see `iter_export`
+    if sign < 0:
+        db.session.execute(
+            update(CorpusTotal)
+            .filter_by(jurisdiction=doc.jurisdiction, year=doc.year)
+            .values(changes)
+        )
+        return
+    insert = pg_insert(CorpusTotal).values(
+        jurisdiction=doc.jurisdiction,
+        year=doc.year,
+        version=changes["version"],
+        **increments,
+    )
+    db.session.execute(
+        insert.on_conflict_do_update(
+            index_elements=["jurisdiction", "year"], set_=changes
+        )
+    )
+
+
+def rebuild_corpus_totals():
+    """Recompute all token totals from scratch, only needed for data from before the totals existed."""
+    db.session.execute(
+        text(
+            "UPDATE document SET num_tokens = (SELECT COALESCE(SUM(count), 0) FROM token_count WHERE token_count.document_id = document.id)"
+        )
+    )
+    rows = (
+        db.session.query(
+            Document.jurisdiction,
+            Document.year,
+            func.count(Document.id),
+            func.coalesce(func.sum(Document.num_pages), 0),
+            func.coalesce(func.sum(Document.num_tokens), 0),
+        )
+        .group_by(Document.jurisdiction, Document.year)
+        .all()
+    )
+    # rebuilt rows get the version the corpus has once they are committed, so no
+    # cache entry or ETag of the old totals is used again
+    version = get_corpus_version() + 1
+    totals = {(t.jurisdiction, t.year): t for t in CorpusTotal.query.all()}
+    for jurisdiction, year, num_docs, num_pages, num_tokens in rows:
+        total = totals.pop((jurisdiction, year), None)
+        if total is None:
+            total = CorpusTotal(jurisdiction=jurisdiction, year=year)
+            db.session.add(total)
+        total.num_docs = num_docs
+        total.num_pages = num_pages
+        total.num_tokens = num_tokens
+        total.version = version
+    # rows without documents are kept, their version tells mirrors about the removal
+    for total in totals.values():
+        if total.num_docs != 0 or total.num_pages != 0 or total.num_tokens != 0:
+            total.num_docs = total.num_pages = total.num_tokens = 0
+            total.version = version
+    db.session.commit()
+    bump_corpus_version()
+
+
 def proc_pdf(pdf_path):
     # no engl for now, no kurzfassung
     if (
@@ -332,52 +595,198 @@ def proc_pdf(pdf_path):
             tc = TokenCount(document=doc, token=token, count=counts[token])
             db.session.add(tc)
 
+        add_ngram_counts(doc, texts)
+
     doc.num_pages = num_pages
+    doc.num_tokens = sum(counts.values())
+    update_corpus_totals(doc)
     db.session.commit()
 
+    write_text_file(pdf_path.stem, texts)
     extract_word_positions(pdf_path)
 
 
+_cube = None
+_cube_mtime = None
+_cube_missing_logged = False
+
+
+def get_cube():
+    """The analytics cube of this process, reloaded when `build-cube` replaced it."""
+    global _cube, _cube_mtime, _cube_missing_logged
+    try:
+        mtime = (CUBE_DIR / "meta.json").stat().st_mtime
+    except FileNotFoundError:
+        if not _cube_missing_logged:
+            app.logger.warning(
+                "No analytics cube, stats are counted from the pages until `flask build-cube` ran"
+            )
+            _cube_missing_logged = True
+        _cube, _cube_mtime = None, None
+        return None
+    _cube_missing_logged = False
+    if mtime != _cube_mtime:
+        try:
+            _cube = AnalyticsCube.load(CUBE_DIR)
+        except (OSError, ValueError):
+            # replaced or removed while loading, answer from SQL this time
+            _cube, _cube_mtime = None, None
+            return None
+        _cube_mtime = mtime
+    return _cube
+
+
+def remove_cube():
+    """Stop answering from a cube that no longer matches the documents."""
+    if CUBE_DIR.exists():
+        shutil.rmtree(CUBE_DIR)
+        print("Analytics cube removed")
+
+
+def cube_counts(q):
+    """Matching pages and occurrences of a query per jurisdiction and year."""
+    counting_q = q.replace('"', "").replace("'", "")
+    content = func.lower(DocumentPage.content)
+    occurrences = (
+        func.length(content) - func.length(func.replace(content, counting_q, ""))
+    ) / func.length(counting_q)
+    return (
+        db.session.query(
+            Document.jurisdiction,
+            Document.year,
+            func.count(DocumentPage.id),
+            func.sum(occurrences),
+        )
+        .join(Document, DocumentPage.document_id == Document.id)
+        .filter(search_match(q))
+        .group_by(Document.jurisdiction, Document.year)
+        .all()
+    )
+
+
+# the most frequent words in the cube, besides the terms of the popular pages
+cube_top_terms = 500
+
+
+def write_cube(top=cube_top_terms):
+    """Count the popular terms and the `top` most frequent words, replacing the cube."""
+    terms = list(index_stats_terms)
+    for qs in popular_trends:
+        terms += qs
+    terms += popular_regional
+    if top > 0:
+        terms += [
+            r[0]
+            for r in db.session.query(TokenCount.token)
+            .filter(func.length(TokenCount.token) >= 4)
+            .filter(TokenCount.token.op("~")("^[[:alpha:]-]+$"))
+            .group_by(TokenCount.token)
+            .order_by(func.sum(TokenCount.count).desc())
+            .limit(top)
+        ]
+    terms = list(dict.fromkeys(cleantext.clean(t, lang="de") for t in terms if t))
+
+    min_year, max_year = db.session.query(
+        func.min(Document.year), func.max(Document.year)
+    ).first()
+    if min_year is None:
+        print("No documents")
+        return
+
+    start = time.perf_counter()
+    cube = AnalyticsCube.empty(terms, jurisdictions, range(min_year, max_year + 1))
+    for term in terms:
+        for jurisdiction, year, pages, occurrences in cube_counts(term):
+            if jurisdiction in jurisdictions:
+                cube.set(term, jurisdiction, year, pages, occurrences or 0)
+    cube.save(CUBE_DIR)
+    print(f"Cube: {len(terms)} terms in {time.perf_counter() - start:.1f}s")
+
+
+def rebuild_cube():
+    """Replace the cube after documents were added or removed, stats are counted from the pages meanwhile."""
+    remove_cube()
+    write_cube()
+
+
+@app.cli.command("build-cube")
+@click.option("--top", default=cube_top_terms, help="Also index the N most frequent words")
+def build_cube(top):
+    """Precompute trend and mention counts of popular terms."""
+    write_cube(top)
+
+
 @app.cli.command()
 def init_db():
     db.create_all()
     db.session.commit()
 
+    for statement in schema_migrations:
+        db.session.execute(text(statement))
+    db.session.commit()
+    if Document.query.filter(Document.num_tokens.is_(None)).count() > 0:
+        print("Computing token totals of existing documents...")
+        rebuild_corpus_totals()
+
+
+@app.cli.command()
+def rebuild_totals():
+    """Recompute token totals per document, jurisdiction and year."""
+    rebuild_corpus_totals()
+
 
 @app.cli.command()
 def clear_cache():
     cache.clear()
 
 
+def ingest_pdf(pdf_path):
+    """Add a PDF to the database, errors are printed and rolled back."""
+    try:
+        proc_pdf(pdf_path)
+    except Exception as e:
+        print(pdf_path, " error, already added?")
+        print(e)
+        db.session.rollback()
+
+
 @app.cli.command()
 @click.argument("pattern")
 def update_docs(pattern="*"):
     Path("/data/images").mkdir(parents=True, exist_ok=True)
     # only add documents that are not already entered
     for pdf_path in Path("/data" + "/pdfs").glob(pattern + ".pdf"):
-        try:
-            proc_pdf(pdf_path)
-        except Exception as e:
-            print(pdf_path, " error, already added?")
-            print(e)
-            db.session.rollback()
-    cache.clear()
+        ingest_pdf(pdf_path)
+    bump_corpus_version()
+    rebuild_cube()
+
+
+def remove_document(file_url):
+    """Delete a document with its pages and counts, the caller commits. False if there is none."""
+    doc = Document.query.filter(Document.file_url == file_url).first()
+    if doc is None:
+        return False
+    # fucked up cascade on creation of db schema, so a a work-around
+    update_corpus_totals(doc, sign=-1)
+    TokenCount.query.filter(TokenCount.document_id == doc.id).delete()
+    NgramCount.query.filter(NgramCount.document_id == doc.id).delete()
+    DocumentPage.query.filter(DocumentPage.document_id == doc.id).delete()
+    Document.query.filter(Document.id == doc.id).delete()
+    return True
 
 
 @app.cli.command()
 @click.argument("pattern")
 def remove_docs(pattern="*"):
     try:
-        # fucked up cascade on creation of db schema, so a a work-around
-        doc = Document.query.filter(Document.file_url == "/pdfs/" + pattern).first()
-        TokenCount.query.filter(TokenCount.document_id == doc.id).delete()
-        DocumentPage.query.filter(DocumentPage.document_id == doc.id).delete()
-        Document.query.filter(Document.file_url == "/pdfs/" + pattern).delete()
+        remove_document("/pdfs/" + pattern)
         db.session.commit()
+        remove_text_file(Path(pattern).stem)
     except Exception as e:
         print(e)
         db.session.rollback()
-    cache.clear()
+    bump_corpus_version()
+    rebuild_cube()
 
 
 @app.cli.command()
@@ -386,7 +795,10 @@ def clear_data():
     db.drop_all()
     db.session.commit()
 
-    cache.clear()
+    bump_corpus_version()
+    remove_cube()
+    if TEXT_DIR.exists():
+        shutil.rmtree(TEXT_DIR)
 
     db.configure_mappers()  # very important!
     db.create_all()
@@ -395,6 +807,33 @@ def clear_data():
     Path("/data/images").mkdir(parents=True, exist_ok=True)
     for pdf_path in Path("/data/pdfs").glob("*.pdf"):
         proc_pdf(pdf_path)
+    bump_corpus_version()
+    write_cube()
+
+
+@app.cli.command("count-ngrams")
+@click.argument("pattern")
+@click.option("--force", is_flag=True, help="Recount documents with current n-grams")
+def count_ngrams_cmd(pattern="*", force=False):
+    """Count n-grams of stored documents. Usage: flask count-ngrams '*'"""
+    for doc in Document.query.order_by(Document.id).all():
+        if not Path(doc.file_url).match(pattern + ".pdf"):
+            continue
+        if doc.ngram_version == ngram_count_version and not force:
+            continue
+        # counts of an older version
+        NgramCount.query.filter(NgramCount.document_id == doc.id).delete()
+
+        print(f"Counting n-grams: {Path(doc.file_url).name}")
+        texts = [
+            r[0]
+            for r in DocumentPage.query.filter(DocumentPage.document_id == doc.id)
+            .order_by(DocumentPage.page_number)
+            .with_entities(DocumentPage.content)
+        ]
+        add_ngram_counts(doc, texts)
+        db.session.commit()
+    cache.delete(corpus_key_prefix("ngrams_complete"))
 
 
 @app.cli.command()
@@ -463,57 +902,419 @@ def extract_wordpos(pattern="*", force=False):
         extract_word_positions(pdf_path)
 
 
+@app.cli.command("write-texts")
+@click.argument("pattern")
+@click.option("--force", is_flag=True, help="Rewrite existing text files")
+def write_texts(pattern="*", force=False):
+    """Write the text files of stored documents. Usage: flask write-texts '*'"""
+    for doc in Document.query.order_by(Document.id).all():
+        pdf_stem = Path(doc.file_url).stem
+        if not Path(doc.file_url).match(pattern + ".pdf"):
+            continue
+        if not force and (TEXT_DIR / f"{pdf_stem}.txt").exists():
+            continue
+
+        print(f"Writing text: {pdf_stem}.txt")
+        write_text_file(pdf_stem, list(iter_page_contents(doc)))
+
+
+@app.cli.command("export-ndjson")
+@click.argument("output", type=click.File("w", encoding="utf-8"))
+@click.option("--since", default=0, help="Only changes after this corpus version")
+@click.option("--after", default=0, help="Continue after this document id")
+def export_ndjson(output, since, after):
+    """Write documents and pages as NDJSON, like /api/export. Usage: flask export-ndjson corpus.ndjson"""
+    for x in iter_export(since, after):
+        output.write(json.dumps(x, ensure_ascii=False) + "\n")
+
+
 DATA_DIRS = ["pdfs", "cleaned", "raw", "deleted"]
 
 
+def manifest_path_of(archive_path):
+    """The manifest is written next to the archive."""
+    return Path(str(archive_path) + ".manifest.json")
+
+
+# smaller files are always compressed, their tar header and padding outweigh the data
+tar_store_min_size = 64 << 10
+
+
+class _GzipMembers:
+    """Gzip streams written one after another, a new one starts where the level changes."""
+
+    def __init__(self, out):
+        self.out = out
+        self.level = None
+        self.compressor = None
+
+    def write(self, data, level):
+        if level != self.level:
+            self.close()
+            self.compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            self.level = level
+        self.out.write(self.compressor.compress(data))
+
+    def close(self):
+        if self.compressor is not None:
+            self.out.write(self.compressor.flush())
+            self.compressor = None
+            self.level = None
+
+
+def _write_tar_member(out, path, rel, compress):
+    """Write a file as tar member to `out`, reading it in chunks, returns its size and SHA-256.
+
+    With `compress`, the member is written as gzip streams. Concatenated they are
+    one gzip file, so members are compressed in parallel like pigz does. Header
+    and padding are always compressed, the data of most PDFs doesn't get smaller
+    and is only wrapped.
+    """
+    stat = path.stat()
+    info = tarfile.TarInfo(rel)
+    info.size = stat.st_size
+    info.mtime = int(stat.st_mtime)
+    info.mode = 0o644
+    gz = _GzipMembers(out) if compress else None
+
+    def write(data, level=6):
+        if gz is None:
+            out.write(data)
+        else:
+            gz.write(data, level)
+
+    write(info.tobuf(tarfile.PAX_FORMAT, "utf-8", "surrogateescape"))
+    sha256 = hashlib.sha256()
+    size = 0
+    level = 6
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(zip_sample_size), b""):
+            if size == 0 and compress and info.size >= tar_store_min_size:
+                saves = len(zlib.compress(chunk, 6)) <= len(chunk) * (1 - zip_min_saving)
+                level = 6 if saves else 0
+            sha256.update(chunk)
+            size += len(chunk)
+            if size > info.size:
+                break
+            write(chunk, level)
+    if size != info.size:
+        raise OSError(f"{rel} changed while exporting")
+    write(b"\0" * (-size % tarfile.BLOCKSIZE))
+    if gz is not None:
+        gz.close()
+    return {"size": size, "sha256": sha256.hexdigest()}
+
+
+def _prepare_tar_member(path, rel, previous, compress):
+    """Manifest entry and gzip-compressed tar member of a file, in a temporary file.
+
+    The member is None if `previous` has the same file, and without `compress`,
+    then the entry is None as well and the member is written by `export_data`.
+    """
+    entry = previous.get(rel)
+    if (
+        entry is not None
+        and entry["size"] == path.stat().st_size
+        and entry["sha256"] == _file_sha256(path)
+    ):
+        return entry, None
+    if not compress:
+        return None, None
+    member = tempfile.TemporaryFile()
+    try:
+        entry = _write_tar_member(member, path, rel, compress)
+    except BaseException:
+        member.close()
+        raise
+    member.seek(0)
+    return entry, member
+
+
 @app.cli.command()
 @click.argument("output_path")
-def export_data(output_path):
-    """Export all data directories as a tar archive."""
+@click.option(
+    "--since",
+    "since_path",
+    help="Manifest of a previous export, only new or changed files are exported",
+)
+@click.option("--workers", default=4, help="Number of files hashed and compressed in parallel")
+def export_data(output_path, since_path, workers):
+    """Export all data directories as a tar archive, gzip-compressed if the name ends with .gz or .tgz.
+
+    A manifest with the SHA-256 of every file is written next to the archive.
+    """
+    files = []
+    for dir_name in DATA_DIRS:
+        dir_path = DATA_DIR / dir_name
+        if not dir_path.exists():
+            continue
+        for f in sorted(dir_path.rglob("*.pdf")):
+            files.append((f, str(f.relative_to(DATA_DIR))))
+
+    previous = {}
+    if since_path is not None:
+        previous = json.loads(Path(since_path).read_text())["files"]
+    compress = output_path.endswith((".gz", ".tgz"))
+
+    def prepare(file):
+        return _prepare_tar_member(file[0], file[1], previous, compress)
+
+    manifest = {}
     total = 0
-    with tarfile.open(output_path, "w") as tar:
-        for dir_name in DATA_DIRS:
-            dir_path = DATA_DIR / dir_name
-            if not dir_path.exists():
+    with open(output_path, "wb") as out:
+        members = _bounded_map(prepare, files, workers)
+        for (path, rel), (entry, member) in zip(files, members):
+            if entry is not None and member is None:
+                # unchanged since the previous export
+                manifest[rel] = entry
                 continue
-            for f in sorted(dir_path.rglob("*.pdf")):
-                rel = f.relative_to(DATA_DIR)
-                tar.add(str(f), arcname=str(rel))
-                print(f"  Added {rel}")
-                total += 1
+            if member is None:
+                entry = _write_tar_member(out, path, rel, compress)
+            else:
+                with member:
+                    shutil.copyfileobj(member, out, 1 << 20)
+            manifest[rel] = entry
+            total += 1
+        end = b"\0" * (2 * tarfile.BLOCKSIZE)
+        out.write(gzip.compress(end, mtime=0) if compress else end)
 
-    if total == 0:
+    manifest_path = manifest_path_of(output_path)
+    manifest_path.write_text(json.dumps({"files": manifest}, indent=1, sort_keys=True))
+
+    if not files:
         print("No PDF files found")
     else:
-        print(f"Exported {total} PDFs to {output_path}")
+        unchanged = len(files) - total
+        print(f"Exported {total} PDFs to {output_path} ({unchanged} unchanged)")
+        print(f"Manifest: {manifest_path}")
+
+
+def _extract_member(tar, member, dest):
+    """Copy a member next to `dest` as a temporary file, returns its path, size and SHA-256."""
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dest.with_name(dest.name + ".tmp")
+    sha256 = hashlib.sha256()
+    size = 0
+    try:
+        with tar.extractfile(member) as src, open(tmp, "wb") as f:
+            for chunk in iter(lambda: src.read(1 << 20), b""):
+                sha256.update(chunk)
+                size += len(chunk)
+                f.write(chunk)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    return tmp, {"size": size, "sha256": sha256.hexdigest()}
+
+
+@contextmanager
+def _open_tar_stream(input_path):
+    """Read a tar archive front to back, without collecting an index of all members first."""
+    with open(input_path, "rb") as f:
+        magic = f.read(2)
+    if magic == b"\x1f\x8b":
+        # tarfile's stream mode stops after the first gzip member, GzipFile
+        # reads all of them, as written by export-data
+        with gzip.open(input_path) as gz, tarfile.open(fileobj=gz, mode="r|") as tar:
+            yield tar
+    else:
+        with tarfile.open(input_path, "r|*") as tar:
+            yield tar
 
 
 @app.cli.command()
 @click.argument("input_path")
-def import_data(input_path):
-    """Import PDFs from a tar archive into /data/ directories."""
+@click.option(
+    "--manifest",
+    "manifest_path",
+    help="Manifest to verify against, defaults to the one next to the archive",
+)
+@click.option(
+    "--ingest",
+    is_flag=True,
+    help="Add PDFs in pdfs/ to the database while the archive is still unpacking",
+)
+@click.option("--workers", default=2, help="Number of PDFs ingested in parallel")
+def import_data(input_path, manifest_path, ingest, workers):
+    """Import PDFs from a tar archive into /data/ directories.
+
+    Members are extracted as they are read. If the export's manifest is there,
+    each file is checked against its SHA-256 before it replaces a local file.
+    """
     input_file = Path(input_path)
     if not input_file.exists():
         print(f"Error: {input_path} does not exist")
         return
 
-    with tarfile.open(input_path, "r:*") as tar:
-        members = [m for m in tar.getmembers() if m.name.endswith(".pdf")]
-        total = 0
-        for member in members:
-            parts = Path(member.name).parts
-            if len(parts) >= 2 and parts[0] in DATA_DIRS:
-                dest = DATA_DIR / Path(member.name).parent
-                dest.mkdir(parents=True, exist_ok=True)
-                tar.extract(member, path=str(DATA_DIR))
+    manifest_file = (
+        Path(manifest_path) if manifest_path else manifest_path_of(input_path)
+    )
+    expected = None
+    if manifest_file.exists():
+        expected = json.loads(manifest_file.read_text())["files"]
+    elif manifest_path:
+        print(f"Error: {manifest_path} does not exist")
+        return
+
+    def ingest_in_context(pdf_path, changed):
+        with app.app_context():
+            # the document of the old PDF would make the new one fail on its file_url
+            if changed and remove_document("/pdfs/" + pdf_path.name):
+                db.session.commit()
+            ingest_pdf(pdf_path)
+
+    total = 0
+    failed = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        ingesting = []
+        with _open_tar_stream(input_path) as tar:
+            for member in tar:
+                parts = Path(member.name).parts
+                if (
+                    not member.isfile()
+                    or not member.name.endswith(".pdf")
+                    or len(parts) < 2
+                    or parts[0] not in DATA_DIRS
+                    or ".." in parts
+                ):
+                    continue
+                dest = DATA_DIR / member.name
+                tmp, entry = _extract_member(tar, member, dest)
+                if expected is not None and expected.get(member.name) != entry:
+                    tmp.unlink()
+                    print(f"  Checksum mismatch, skipped {member.name}")
+                    failed.append(member.name)
+                    continue
+                changed = dest.exists() and (
+                    dest.stat().st_size != entry["size"]
+                    or _file_sha256(dest) != entry["sha256"]
+                )
+                os.replace(tmp, dest)
                 print(f"  Extracted {member.name}")
                 total += 1
+                if ingest and len(parts) == 2 and parts[0] == "pdfs":
+                    ingesting.append(executor.submit(ingest_in_context, dest, changed))
+        for future in ingesting:
+            future.result()
 
     print(f"Imported {total} PDFs")
-
-
-def _build_pdf_zip(force):
-    """Build ZIP archive of all PDFs."""
+    if failed:
+        print(f"{len(failed)} PDFs failed verification: {', '.join(failed)}")
+    if expected is not None:
+        # an incremental export only contains changed files, the others must be here already
+        missing = [
+            name
+            for name in expected
+            if name not in failed and not (DATA_DIR / name).exists()
+        ]
+        if missing:
+            print(f"{len(missing)} PDFs of the manifest are missing: {', '.join(missing)}")
+    if ingest:
+        bump_corpus_version()
+        rebuild_cube()
+
+
+# PDFs are mostly compressed already, they are only deflated if a sample shrinks by this much
+zip_min_saving = 0.1
+zip_sample_size = 1 << 20
+
+
+def _prepare_zip_entry(path):
+    """ZipInfo and deflated bytes of a file, or only the ZipInfo if it's stored as is.
+
+    Runs in worker threads, zlib releases the GIL while compressing.
+    """
+    info = zipfile.ZipInfo.from_file(str(path), path.name)
+    with open(path, "rb") as f:
+        sample = f.read(zip_sample_size)
+        if len(zlib.compress(sample, 6)) > len(sample) * (1 - zip_min_saving):
+            info.compress_type = zipfile.ZIP_STORED
+            return info, None
+
+        info.compress_type = zipfile.ZIP_DEFLATED
+        compressor = zlib.compressobj(6, zlib.DEFLATED, -zlib.MAX_WBITS)
+        crc, parts = 0, []
+        chunk = sample
+        while chunk:
+            crc = zlib.crc32(chunk, crc)
+            parts.append(compressor.compress(chunk))
+            chunk = f.read(zip_sample_size)
+        parts.append(compressor.flush())
+
+    data = b"".join(parts)
+    info.CRC = crc
+    info.compress_size = len(data)
+    return info, data
+
+
+def _append_raw_entry(zf, info, chunks):
+    """Write an entry whose bytes are already compressed, `zipfile` has no API for this."""
+    zf.fp.seek(zf.start_dir)
+    info.header_offset = zf.start_dir
+    zf.fp.write(info.FileHeader())
+    for chunk in chunks:
+        zf.fp.write(chunk)
+    zf.filelist.append(info)
+    zf.NameToInfo[info.filename] = info
+    zf.start_dir = zf.fp.tell()
+    zf._didModify = True
+
+
+def _raw_entry_chunks(zf, info):
+    """Compressed bytes of an entry, read without decompressing them."""
+    zf.fp.seek(info.header_offset)
+    header = zf.fp.read(zipfile.sizeFileHeader)
+    name_length, extra_length = struct.unpack("<HH", header[26:30])
+    zf.fp.seek(info.header_offset + zipfile.sizeFileHeader + name_length + extra_length)
+    remaining = info.compress_size
+    while remaining > 0:
+        chunk = zf.fp.read(min(remaining, zip_sample_size))
+        if not chunk:
+            raise zipfile.BadZipFile(f"Truncated entry {info.filename}")
+        remaining -= len(chunk)
+        yield chunk
+
+
+def _copy_raw_entry(src, dest, info):
+    """Copy an entry to another archive as it is, without compressing it again."""
+    new = zipfile.ZipInfo(info.filename, info.date_time)
+    new.compress_type = info.compress_type
+    new.external_attr = info.external_attr
+    new.CRC = info.CRC
+    new.file_size = info.file_size
+    new.compress_size = info.compress_size
+    _append_raw_entry(dest, new, _raw_entry_chunks(src, info))
+
+
+def _bounded_map(fn, items, workers):
+    """Like `executor.map`, but only a few items are submitted ahead, so results don't pile up in memory."""
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for item in items:
+            pending.append(executor.submit(fn, item))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def _add_files(zf, paths, workers):
+    """Add files in order, files that are worth compressing are deflated in parallel."""
+    entries = _bounded_map(_prepare_zip_entry, paths, workers)
+    for path, (info, data) in zip(paths, entries):
+        if data is None:
+            zf.write(str(path), path.name, compress_type=zipfile.ZIP_STORED)
+        else:
+            _append_raw_entry(zf, info, [data])
+
+
+def _build_pdf_zip(force, workers=4):
+    """Build ZIP archive of all PDFs.
+
+    New PDFs are appended. When one was removed or changed, a new archive is written
+    with the unchanged entries copied byte for byte, so only the changed PDFs are
+    compressed again.
+    """
     ZIP_DIR.mkdir(parents=True, exist_ok=True)
     dest = ZIP_DIR / "vsberichte.zip"
     tmp = ZIP_DIR / "vsberichte.zip.tmp"
@@ -522,26 +1323,34 @@ def _build_pdf_zip(force):
     disk_files = {p.name: p.stat().st_size for p in pdfs}
 
     existing = {}
-    needs_rebuild = force or not dest.exists()
-
-    if not needs_rebuild:
+    needs_rewrite = False
+    if not force and dest.exists():
         with zipfile.ZipFile(str(dest), "r") as zf:
             existing = {i.filename: i.file_size for i in zf.infolist()}
         # Check if any zip entry was deleted or changed on disk
-        for name, size in existing.items():
-            if disk_files.get(name) != size:
-                needs_rebuild = True
-                break
+        needs_rewrite = any(disk_files.get(n) != size for n, size in existing.items())
 
-    if needs_rebuild:
-        # Full rebuild
+    if force or not dest.exists():
         if tmp.exists():
             tmp.unlink()
-        with zipfile.ZipFile(str(tmp), "w", compression=zipfile.ZIP_DEFLATED) as zf:
-            for pdf in pdfs:
-                zf.write(str(pdf), pdf.name)
+        with zipfile.ZipFile(str(tmp), "w") as zf:
+            _add_files(zf, pdfs, workers)
         shutil.move(str(tmp), str(dest))
         print(f"PDF ZIP: {len(pdfs)} files (rebuilt)")
+    elif needs_rewrite:
+        if tmp.exists():
+            tmp.unlink()
+        copied, added = 0, []
+        with zipfile.ZipFile(str(dest), "r") as src, zipfile.ZipFile(str(tmp), "w") as zf:
+            for pdf in pdfs:
+                if existing.get(pdf.name) == disk_files[pdf.name]:
+                    _copy_raw_entry(src, zf, src.getinfo(pdf.name))
+                    copied += 1
+                else:
+                    added.append(pdf)
+            _add_files(zf, added, workers)
+        shutil.move(str(tmp), str(dest))
+        print(f"PDF ZIP: {len(pdfs)} files ({copied} copied, {len(added)} compressed)")
     else:
         new_files = [p for p in pdfs if p.name not in existing]
         if not new_files:
@@ -549,164 +1358,496 @@ def _build_pdf_zip(force):
             return
         # Append only new files
         with zipfile.ZipFile(str(dest), "a") as zf:
-            for pdf in new_files:
-                zf.write(str(pdf), pdf.name)
+            _add_files(zf, new_files, workers)
         print(f"PDF ZIP: {len(existing) + len(new_files)} files ({len(new_files)} new)")
 
 
-def _build_text_zip():
-    """Build ZIP archive of text exports from the database."""
+def _file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _build_text_zip(force=False):
+    """Build ZIP archive of the text files, only appending new reports if possible.
+
+    The content hashes of the entries are kept in a manifest next to the archive,
+    a hash is only computed again when the size or mtime of a text file changed.
+    """
     ZIP_DIR.mkdir(parents=True, exist_ok=True)
     dest = ZIP_DIR / "vsberichte-texts.zip"
     tmp = ZIP_DIR / "vsberichte-texts.zip.tmp"
-
-    if tmp.exists():
-        tmp.unlink()
+    manifest_path = ZIP_DIR / "vsberichte-texts.json"
 
     docs = Document.query.order_by(Document.jurisdiction, Document.year).all()
-    total = 0
-    with zipfile.ZipFile(str(tmp), "w", compression=zipfile.ZIP_DEFLATED) as zf:
-        for doc in docs:
-            text = "\n\n\n".join([p.content for p in doc.pages])
-            fname = Path(doc.file_url).stem + ".txt"
-            zf.writestr(fname, text)
-            total += 1
+    files = []
+    for doc in docs:
+        pdf_stem = Path(doc.file_url).stem
+        text_path = TEXT_DIR / f"{pdf_stem}.txt"
+        if not text_path.exists():
+            # reports added before the text files existed
+            write_text_file(pdf_stem, list(iter_page_contents(doc)))
+        files.append(text_path)
 
-    shutil.move(str(tmp), str(dest))
-    print(f"Text ZIP: {total} files")
+    existing = {}
+    if not force and dest.exists() and manifest_path.exists():
+        existing = json.loads(manifest_path.read_text())
+        with zipfile.ZipFile(str(dest), "r") as zf:
+            if sorted(zf.namelist()) != sorted(existing):
+                existing = {}
+
+    manifest = {}
+    for text_path in files:
+        stat = text_path.stat()
+        known = existing.get(text_path.name)
+        if (
+            known is not None
+            and known["size"] == stat.st_size
+            and known["mtime_ns"] == stat.st_mtime_ns
+        ):
+            sha256 = known["sha256"]
+        else:
+            sha256 = _file_sha256(text_path)
+        manifest[text_path.name] = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": sha256,
+        }
+
+    # entries can't be replaced in a ZIP, removed or changed reports need a rebuild
+    needs_rebuild = not existing or any(
+        manifest.get(name, {}).get("sha256") != x["sha256"]
+        for name, x in existing.items()
+    )
+
+    if needs_rebuild:
+        if tmp.exists():
+            tmp.unlink()
+        with zipfile.ZipFile(str(tmp), "w", compression=zipfile.ZIP_DEFLATED) as zf:
+            for text_path in files:
+                zf.write(str(text_path), text_path.name)
+        shutil.move(str(tmp), str(dest))
+        print(f"Text ZIP: {len(files)} files (rebuilt)")
+    else:
+        new_files = [p for p in files if p.name not in existing]
+        if new_files:
+            with zipfile.ZipFile(
+                str(dest), "a", compression=zipfile.ZIP_DEFLATED
+            ) as zf:
+                for text_path in new_files:
+                    zf.write(str(text_path), text_path.name)
+        print(f"Text ZIP: {len(files)} files ({len(new_files)} new)")
+
+    tmp_manifest = manifest_path.with_name(manifest_path.name + ".tmp")
+    tmp_manifest.write_text(json.dumps(manifest))
+    os.replace(tmp_manifest, manifest_path)
+
+
+# Bundles of the PDFs or texts of one jurisdiction or decade, e.g. `vsberichte-by.zip`,
+# `vsberichte-1990er-texts.zip`. They are only built by `create-zips --split`,
+# which runs at deploy and after `update-docs`, and rebuilt there when a report
+# of the bundle changed.
+bundle_re = re.compile(r"vsberichte-(?P<key>[a-z]+|\d{3}0er)(?P<texts>-texts)?\.zip")
+bundle_keys = {a.lower(): j for a, j in report_info["abr"]}
+bundle_keys["bund"] = "Bund"
+bundle_names = {j: k for k, j in bundle_keys.items()}
+# a bundle whose build started longer ago is assumed to be abandoned
+bundle_lock_timeout = 60 * 60
+
+
+def parse_bundle(filename):
+    """(jurisdiction, first year, last year, texts) of a bundle name, None if it isn't one."""
+    m = bundle_re.fullmatch(filename)
+    if m is None:
+        return None
+    texts = m.group("texts") is not None
+    key = m.group("key")
+    if key in bundle_keys:
+        return bundle_keys[key], None, None, texts
+    if key[0].isdigit():
+        decade = int(key[:4])
+        return None, decade, decade + 9, texts
+    return None
+
+
+def bundle_version(bundle):
+    """Number of documents and version of the last change of the reports of a bundle."""
+    jurisdiction, min_year, max_year, _ = bundle
+    return get_coverage().last_change(jurisdiction, min_year, max_year)
+
+
+def bundle_is_current(filename, version):
+    path = ZIP_DIR / filename
+    if not path.exists():
+        return False
+    try:
+        with zipfile.ZipFile(str(path), "r") as zf:
+            return zf.comment == f"corpus-version {version}".encode()
+    except zipfile.BadZipFile:
+        return False
+
+
+def _build_bundle(filename):
+    """Write a bundle, PDFs are copied from `vsberichte.zip` without compressing them again."""
+    jurisdiction, min_year, max_year, texts = bundle = parse_bundle(filename)
+    _, version = bundle_version(bundle)
+
+    ZIP_DIR.mkdir(parents=True, exist_ok=True)
+    lock = ZIP_DIR / (filename + ".lock")
+    try:
+        fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        if time.time() - lock.stat().st_mtime < bundle_lock_timeout:
+            return False
+        lock.unlink()
+        fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    os.close(fd)
+
+    try:
+        query = Document.query
+        if jurisdiction is not None:
+            query = query.filter(Document.jurisdiction == jurisdiction)
+        if min_year is not None:
+            query = query.filter(Document.year.between(min_year, max_year))
+        docs = query.order_by(Document.jurisdiction, Document.year).all()
+
+        tmp = ZIP_DIR / (filename + ".tmp")
+        with zipfile.ZipFile(str(tmp), "w") as zf:
+            if texts:
+                for doc in docs:
+                    pdf_stem = Path(doc.file_url).stem
+                    text_path = TEXT_DIR / f"{pdf_stem}.txt"
+                    if not text_path.exists():
+                        write_text_file(pdf_stem, list(iter_page_contents(doc)))
+                    zf.write(
+                        str(text_path),
+                        text_path.name,
+                        compress_type=zipfile.ZIP_DEFLATED,
+                    )
+            else:
+                pdfs = [PDF_DIR / Path(doc.file_url).name for doc in docs]
+                _add_pdfs_from_archive(zf, pdfs)
+            zf.comment = f"corpus-version {version}".encode()
+        os.replace(tmp, ZIP_DIR / filename)
+        print(f"Bundle {filename}: {len(docs)} files")
+        return True
+    finally:
+        lock.unlink(missing_ok=True)
+
+
+def _add_pdfs_from_archive(zf, pdfs, workers=2):
+    """Add PDFs, copying the entries of `vsberichte.zip` if it has the same file."""
+    full = ZIP_DIR / "vsberichte.zip"
+    if not full.exists():
+        _add_files(zf, pdfs, workers)
+        return
+    with zipfile.ZipFile(str(full), "r") as src:
+        entries = {i.filename: i for i in src.infolist()}
+        missing = []
+        for pdf in pdfs:
+            info = entries.get(pdf.name)
+            if info is not None and info.file_size == pdf.stat().st_size:
+                _copy_raw_entry(src, zf, info)
+            else:
+                missing.append(pdf)
+    _add_files(zf, missing, workers)
+
+
+def _build_bundles(force):
+    """Build the bundles of all jurisdictions and decades with reports."""
+    coverage = get_coverage()
+    keys = [bundle_names[j] for j in coverage.jurisdictions if j in bundle_names]
+    if coverage.min_year is not None:
+        first_decade = coverage.min_year // 10 * 10
+        keys += [
+            f"{decade}er" for decade in range(first_decade, coverage.max_year + 1, 10)
+        ]
+    for key in keys:
+        for suffix in ["", "-texts"]:
+            filename = f"vsberichte-{key}{suffix}.zip"
+            num_docs, version = bundle_version(parse_bundle(filename))
+            if num_docs == 0:
+                (ZIP_DIR / filename).unlink(missing_ok=True)
+            elif force or not bundle_is_current(filename, version):
+                _build_bundle(filename)
 
 
 @app.cli.command("create-zips")
 @click.option("--force", is_flag=True, help="Rebuild from scratch")
 @click.option("--pdfs/--no-pdfs", default=True)
 @click.option("--texts/--no-texts", default=True)
-def create_zips(force, pdfs, texts):
+@click.option("--workers", default=4, help="Number of PDFs compressed in parallel")
+@click.option(
+    "--split", is_flag=True, help="Also build the bundles per jurisdiction and decade"
+)
+def create_zips(force, pdfs, texts, workers, split):
     """Create ZIP archives of all PDFs and text exports."""
     if pdfs:
         print("Building PDF ZIP...")
-        _build_pdf_zip(force)
+        _build_pdf_zip(force, workers)
     if texts:
         print("Building text ZIP...")
-        _build_text_zip()
+        _build_text_zip(force)
+    if split:
+        print("Building bundles...")
+        _build_bundles(force)
     # Fix ownership when running as root (e.g. dokku run) so the web
     # process (herokuish UID 32767) can serve the files consistently.
-    if os.getuid() == 0 and ZIP_DIR.exists():
+    # The text files written by `write_text_file` belong to it as well.
+    if os.getuid() == 0:
         stat = DATA_DIR.stat()
-        for f in ZIP_DIR.iterdir():
-            os.chown(f, stat.st_uid, stat.st_gid)
-        os.chown(ZIP_DIR, stat.st_uid, stat.st_gid)
+        for d in (ZIP_DIR, TEXT_DIR):
+            if not d.exists():
+                continue
+            for f in d.iterdir():
+                os.chown(f, stat.st_uid, stat.st_gid)
+            os.chown(d, stat.st_uid, stat.st_gid)
     print("Done.")
 
 
-def get_index():
-    res = []
-    total = 0
-    for x in jurisdictions:
-        years = []
-        for d in (
-            Document.query.filter_by(jurisdiction=x)
-            .order_by(Document.year.desc())
+def warm_cache_urls(documents=True):
+    """URLs whose cached responses should be rendered before visitors ask for them."""
+    urls = ["/", "/berichte", "/api", "/impressum", "/blog/", index_stats_url]
+
+    if documents:
+        for jurisdiction, year in (
+            Document.query.with_entities(Document.jurisdiction, Document.year)
+            .order_by(Document.jurisdiction, Document.year)
             .all()
         ):
-            years.append(d.year)
-            total += 1
-        res.append({"jurisdiction": x, "years": years})
-    return res, total
+            j = quote(jurisdiction.lower())
+            urls.append(f"/{j}/{year}")
+            urls.append(f"/api/{j}/{year}")
+
+    # same URLs as the JavaScript of `trends.html` and `regional.html` requests
+    for qs in popular_trends:
+        params = "&".join("q=" + quote(q, safe="") for q in qs)
+        urls.append("/trends?" + params)
+        urls.append("/stats/batch?" + params)
+    for q in popular_regional:
+        urls.append("/regional?q=" + quote(q, safe=""))
+        urls.append("/api/mentions?min_year=1993&max_year=2024&q=" + quote(q, safe=""))
+    return urls
+
+
+@app.cli.command("warm-cache")
+@click.option("--workers", default=4, help="Number of pages rendered in parallel")
+@click.option("--documents/--no-documents", default=True, help="Include every report")
+def warm_cache(workers, documents):
+    """Render cached pages in-process to fill the cache, e.g. after adding documents."""
+    urls = warm_cache_urls(documents)
+    adapter = app.url_map.bind("localhost")
+
+    def render(url):
+        start = time.perf_counter()
+        with app.test_client() as client:
+            status = client.get(url).status_code
+        return url, status, time.perf_counter() - start
+
+    timings = defaultdict(list)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for url, status, duration in executor.map(render, urls):
+            print(f"  {status} {duration:6.2f}s {url}")
+            endpoint, _ = adapter.match(url.split("?")[0])
+            timings[endpoint].append(duration)
+
+    print(f"Warmed {len(urls)} URLs in {time.perf_counter() - start:.1f}s")
+    for endpoint, durations in sorted(
+        timings.items(), key=lambda x: sum(x[1]), reverse=True
+    ):
+        print(
+            f"  {endpoint}: {len(durations)} URLs, {sum(durations):.2f}s total, {max(durations):.2f}s max"
+        )
+
+
+# snapshot of the reports per jurisdiction and year, kept by each process
+_coverage = None
+
+
+def get_coverage():
+    """Reports per jurisdiction and year, only read from the database when the corpus version changed."""
+    global _coverage
+    version = get_corpus_version()
+    if _coverage is None or _coverage.version != version:
+        documents = db.session.query(
+            CorpusTotal.jurisdiction,
+            CorpusTotal.year,
+            CorpusTotal.num_docs,
+            CorpusTotal.version,
+        ).all()
+        _coverage = Coverage(documents, report_info, version)
+    return _coverage
+
+
+def corpus_key_prefix(key):
+    """Cache key that changes with the corpus version, old entries are not read again and expire."""
+    return f"corpus-{get_corpus_version()}/{key}"
+
+
+def corpus_view_key(*args, **kwargs):
+    return corpus_key_prefix("view" + request.path)
+
+
+def corpus_query_view_key(*args, **kwargs):
+    """Like `query_string=True`, the order of the arguments does not matter."""
+    query = urlencode(sorted(request.args.items(multi=True)))
+    return corpus_key_prefix("view" + request.path + "?" + query)
+
+
+def document_view_key(jurisdiction, year, **kwargs):
+    """Cache key of the views of a report, only changes when the report is added or removed."""
+    version = get_coverage().document_version(jurisdiction.title(), year)
+    return f"document-{version}/view{request.path}"
+
+
+# entries of `single_flight_cached` views are kept this long after they expired,
+# the old value is served while one request computes the new one
+stale_timeout = 60 * 60
+# within this time, an entry is recomputed by one process only
+refresh_lock_timeout = 5 * 60
+# how long a request waits for another process that computes a missing entry,
+# well below the 30 s after which gunicorn kills a worker
+single_flight_wait = 5
+# background refreshes of expired entries, a few at a time
+refresh_executor = ThreadPoolExecutor(max_workers=2)
+
+
+def _compute_entry(f, args, kwargs, key, timeout):
+    start = time.perf_counter()
+    value = f(*args, **kwargs)
+    duration = time.perf_counter() - start
+    timeout = timeout or app.config.get("CACHE_DEFAULT_TIMEOUT", 300)
+    cache.set(
+        key, (value, time.time() + timeout, duration), timeout=timeout + stale_timeout
+    )
+    return value
+
+
+def _refresh_in_background(f, args, kwargs, key, lock_key, timeout):
+    # WSGI passes the query string as latin-1
+    path, query_string = request.path, request.query_string.decode("latin-1")
+
+    def run():
+        with app.test_request_context(path, query_string=query_string):
+            try:
+                _compute_entry(f, args, kwargs, key, timeout)
+            except Exception:
+                app.logger.exception("Refreshing %s failed", key)
+                cache.delete(lock_key)
+
+    refresh_executor.submit(run)
+
+
+def single_flight_cached(make_cache_key, timeout=None):
+    """Like `cache.cached`, for views with expensive queries. An entry is computed by one request at a time.
+
+    Once an entry expired, requests get the previous value until the new one is
+    computed in the background, which is fine as the corpus version is part of
+    the key. Entries are recomputed a bit before they expire, the earlier the
+    more often they are requested and the longer they took (XFetch).
+    """
+
+    def decorator(f):
+        @functools.wraps(f)
+        def wrapper(*args, **kwargs):
+            key = make_cache_key(*args, **kwargs)
+            lock_key = key + "/lock"
+            entry = cache.get(key)
+            if entry is not None:
+                value, expires, duration = entry
+                # -log(u) is exponentially distributed, so each request has a small
+                # chance to refresh early, growing towards the expiry
+                early = -duration * math.log(1.0 - random.random())
+                # the lock is kept after a refresh, so processes that still hold the old
+                # entry in their LRU don't refresh it again
+                if time.time() + early >= expires and cache.add(
+                    lock_key, 1, timeout=refresh_lock_timeout
+                ):
+                    _refresh_in_background(f, args, kwargs, key, lock_key, timeout)
+                return value
+
+            if cache.add(lock_key, 1, timeout=refresh_lock_timeout):
+                try:
+                    return _compute_entry(f, args, kwargs, key, timeout)
+                finally:
+                    cache.delete(lock_key)
+
+            # another process computes it, wait for its result instead of running the same query
+            deadline = time.monotonic() + single_flight_wait
+            while time.monotonic() < deadline:
+                time.sleep(0.1)
+                entry = cache.get(key)
+                if entry is not None:
+                    return entry[0]
+            # computing it as well would only add to the load that delays the other process
+            resp = make_response(
+                "Die Anfrage wird gerade berechnet, bitte in einigen Sekunden erneut versuchen.",
+                503,
+            )
+            resp.headers["Retry-After"] = "10"
+            resp.headers["Content-Type"] = "text/plain; charset=utf-8"
+            return resp
+
+        return wrapper
+
+    return decorator
+
+
+def get_index():
+    coverage = get_coverage()
+    res = [{"jurisdiction": x, "years": coverage.years(x)} for x in jurisdictions]
+    return res, coverage.total
 
 
 # Blog functions
-def get_blog_posts():
-    """Load all blog posts from markdown files."""
-    # In Docker, src/ is mounted at /app/, so blog posts are at /app/blog/posts/
-    blog_dir = Path("/app/blog/posts")
-    if not blog_dir.exists():
-        return []
+# In Docker, src/ is mounted at /app/, so blog posts are at /app/blog/posts/
+blog = BlogIndex("/app/blog/posts")
 
-    posts = []
-    for md_file in blog_dir.glob("*.md"):
-        try:
-            with open(md_file, "r", encoding="utf-8") as f:
-                post = frontmatter.load(f)
-                # Render markdown and wrap tables for responsiveness
-                html_content = markdown.markdown(
-                    post.content,
-                    extensions=["fenced_code", "codehilite", "tables"]
-                )
-                # Wrap tables in a responsive container
-                html_content = html_content.replace(
-                    '<table>',
-                    '<div class="table-responsive"><table>'
-                ).replace('</table>', '</table></div>')
-
-                post_data = {
-                    "title": post.get("title", ""),
-                    "date": post.get("date"),
-                    "tags": post.get("tags", []),
-                    "slug": post.get("slug", md_file.stem),
-                    "content": html_content,
-                }
-                posts.append(post_data)
-        except Exception as e:
-            print(f"Error loading {md_file}: {e}")
 
-    # Sort by date, newest first
-    posts.sort(key=lambda x: x["date"], reverse=True)
-    return posts
+def get_blog_posts():
+    """All blog posts, newest first."""
+    return blog.posts()
 
 
 def get_blog_post(slug):
-    """Load a single blog post by slug."""
-    # In Docker, src/ is mounted at /app/, so blog posts are at /app/blog/posts/
-    blog_dir = Path("/app/blog/posts")
+    """A single blog post by slug, None if there is none."""
+    return blog.get(slug)
 
-    # Find the markdown file with this slug
-    for md_file in blog_dir.glob("*.md"):
-        try:
-            with open(md_file, "r", encoding="utf-8") as f:
-                post = frontmatter.load(f)
-                if post.get("slug") == slug or md_file.stem.endswith(slug):
-                    # Render markdown and wrap tables for responsiveness
-                    html_content = markdown.markdown(
-                        post.content,
-                        extensions=["fenced_code", "codehilite", "tables"]
-                    )
-                    # Wrap tables in a responsive container
-                    html_content = html_content.replace(
-                        '<table>',
-                        '<div class="table-responsive"><table>'
-                    ).replace('</table>', '</table></div>')
-
-                    return {
-                        "title": post.get("title", ""),
-                        "date": post.get("date"),
-                        "tags": post.get("tags", []),
-                        "slug": post.get("slug", md_file.stem),
-                        "content": html_content,
-                    }
-        except Exception as e:
-            print(f"Error loading {md_file}: {e}")
 
-    return None
+# all series of the homepage charts in one request
+index_stats_terms = [
+    "raf", "nsu", "npd", "pkk", "dkp", "internet", "facebook", "zeitung", "cyber"
+]
+index_stats_url = "/stats/batch?" + "&".join("q=" + q for q in index_stats_terms)
 
 
 @app.route("/")
-@cache.cached(timeout=60 * 60)
+@cache.cached(timeout=60 * 60, make_cache_key=corpus_view_key)
 def index():
     res, total = get_index()
-    return render_template("index.html", docs=res, total=total)
+    return render_template(
+        "index.html", docs=res, total=total, stats_url=index_stats_url
+    )
 
 
 @app.route("/berichte")
-@cache.cached(timeout=60 * 60)
+@cache.cached(timeout=60 * 60, make_cache_key=corpus_view_key)
 def reports():
     res, total = get_index()
     return render_template(
-        "reports.html", docs=res, total=total, report_info=report_info
+        "reports.html",
+        docs=res,
+        total=total,
+        report_info=report_info,
+        bundle_names=bundle_names,
     )
 
 
 @app.route("/<jurisdiction>/<int:year>")
-@cache.cached()
+@cache.cached(make_cache_key=document_view_key)
 def details(jurisdiction, year):
     jurisdiction = jurisdiction.title()
     d = Document.query.filter_by(jurisdiction=jurisdiction, year=year).first()
@@ -714,12 +1855,50 @@ def details(jurisdiction, year):
     if d is None:
         abort(404)
 
-    sumed = (
-        TokenCount.query.filter(TokenCount.document_id == d.id)
-        .with_entities(func.sum(TokenCount.count))
-        .scalar()
+    return render_template(
+        "details.html",
+        d=d,
+        pages=page_window(d.id, 0),
+        page_window_size=page_window_size,
+        pages_url=f"/api/{quote(d.jurisdiction.lower())}/{d.year}/pages/",
+        counts=d.num_tokens,
+        report_info=report_info,
     )
-    return render_template("details.html", d=d, counts=sumed, report_info=report_info)
+
+
+# pages of a report shown at first, further ones are loaded in windows of the same size
+page_window_size = 25
+
+
+def page_window(document_id, index):
+    """Page numbers and image URLs of the `index`-th window of pages of a document."""
+    first = index * page_window_size + 1
+    return (
+        db.session.query(DocumentPage.page_number, DocumentPage.file_url)
+        .filter(
+            DocumentPage.document_id == document_id,
+            DocumentPage.page_number.between(first, first + page_window_size - 1),
+        )
+        .order_by(DocumentPage.page_number)
+        .all()
+    )
+
+
+@app.route("/api/<jurisdiction>/<int:year>/pages/<int:index>")
+@cache.cached(make_cache_key=document_view_key)
+def api_page_window(jurisdiction, year, index):
+    """Pages of the lazily loaded viewer of `details`."""
+    d = (
+        db.session.query(Document.id)
+        .filter_by(jurisdiction=jurisdiction.title(), year=year)
+        .first()
+    )
+    if d is None:
+        abort(404)
+    pages = page_window(d.id, index)
+    if not pages:
+        abort(404)
+    return jsonify([{"page_number": n, "file_url": f} for n, f in pages])
 
 
 def build_query():
@@ -779,51 +1958,155 @@ def build_query():
 trends_min_year = 1993
 
 
-@cache.cached(key_prefix="total_years")
+@cache.cached(key_prefix=lambda: corpus_key_prefix("total_years"))
 def get_year_totals():
     year_total = (
-        TokenCount.query.join(Document)
+        db.session.query(CorpusTotal.year, func.sum(CorpusTotal.num_tokens))
+        .filter(CorpusTotal.year >= trends_min_year, CorpusTotal.num_docs > 0)
+        .group_by(CorpusTotal.year)
+        .all()
+    )
+    return [tuple(x) for x in year_total]
+
+
+def search_match(q):
+    """Full-text match on a page, the same filter as `DocumentPage.query.search(q)`."""
+    return DocumentPage.search_vector.op("@@")(
+        func.parse_websearch("pg_catalog.german", q)
+    )
+
+
+def is_empty_search(q):
+    """Whether a query has no words to search for, e.g. only punctuation, operators or stop words."""
+    if not q.strip():
+        return True
+    tsquery = func.parse_websearch("pg_catalog.german", q)
+    return db.session.query(func.numnode(tsquery)).scalar() == 0
+
+
+@cache.cached(key_prefix=lambda: corpus_key_prefix("ngrams_complete"))
+def ngrams_complete():
+    """Whether every document has current n-gram counts, i.e. `count-ngrams` ran after an upgrade."""
+    outdated = Document.ngram_version.is_distinct_from(ngram_count_version)
+    return Document.query.filter(outdated).count() == 0
+
+
+def ngram_year_counts(ngram, jurisdiction, min_year, max_year):
+    query = (
+        db.session.query(Document.year, func.sum(NgramCount.count))
+        .join(NgramCount, NgramCount.document_id == Document.id)
+        .filter(NgramCount.ngram == ngram)
         .filter(Document.year >= trends_min_year)
-        .group_by(Document.year)
-        .values(Document.year, func.sum(TokenCount.count))
     )
-    return list(year_total)
+    if jurisdiction is not None:
+        query = query.filter(Document.jurisdiction == jurisdiction.title())
+    if min_year is not None:
+        query = query.filter(Document.year >= min_year)
+    if max_year is not None:
+        query = query.filter(Document.year <= max_year)
+    return query.group_by(Document.year).all()
+
+
+def compute_stats(qs):
+    """Relative yearly frequencies for several queries in one pass over the hits."""
+    qs = [cleantext.clean(q, lang="de") for q in qs]
+    # for qs like "token" remove the quotes to count
+    counting_qs = [q.replace('"', "").replace("'", "") for q in qs]
+
+    query, page, jurisdiction, max_year, min_year = build_query()
+    ds = [defaultdict(int) for _ in qs]
+
+    # phrases are looked up in the precomputed n-grams, the rest is counted in the page texts
+    ngrams = [query_ngram(q) for q in qs]
+    if not ngrams_complete():
+        ngrams = [None for _ in qs]
+    for i, ngram in enumerate(ngrams):
+        if ngram is not None:
+            for year, count in ngram_year_counts(ngram, jurisdiction, min_year, max_year):
+                ds[i][year] += count
+
+    # precomputed terms are read from the cube, only the rest is counted in the page texts
+    cube = get_cube()
+    scanned = []
+    for i, ngram in enumerate(ngrams):
+        if ngram is not None:
+            continue
+        if cube is None or qs[i] not in cube:
+            scanned.append(i)
+            continue
+        for year, count in cube.occurrences_by_year(
+            qs[i],
+            None if jurisdiction is None else jurisdiction.title(),
+            trends_min_year if min_year is None else max(min_year, trends_min_year),
+            max_year,
+        ).items():
+            ds[i][year] += count
+
+    if len(scanned) > 0:
+        matches = [search_match(qs[i]) for i in scanned]
+        all_results = (
+            query.join(Document)
+            .filter(Document.year >= trends_min_year)
+            .filter(or_(*matches))
+            .with_entities(
+                Document.year,
+                DocumentPage.content,
+                *[m.label(f"match_{i}") for i, m in zip(scanned, matches)],
+            )
+        )
+
+        for r in all_results:
+            content = r.content.lower()
+            for j, i in enumerate(scanned):
+                # only count pages the full-text search matched for this query
+                if r[2 + j]:
+                    ds[i][r.year] += content.count(counting_qs[i])
+
+    for year_tup in get_year_totals():
+        for d in ds:
+            d[year_tup[0]] /= year_tup[1]
+
+    for q, d in zip(qs, ds):
+        # fix NSU
+        if q.lower() == "nsu":
+            for y in range(trends_min_year, 2009):
+                d[y] = 0
+
+    return [[q, d] for q, d in zip(qs, ds)]
 
 
 @app.route("/stats")
-@cache.cached(query_string=True)
+@single_flight_cached(corpus_query_view_key)
 def stats():
     q = request.args.get("q")
     if q is None:
         return jsonify({})
-    q = cleantext.clean(q, lang="de")
-    # for qs like "token" remove the quotes to count
-    counting_q = q.replace('"', "").replace("'", "")
+    return jsonify(compute_stats([q])[0])
 
-    query, page, jurisdiction, max_year, min_year = build_query()
 
-    all_results = (
-        query.join(Document)
-        .filter(Document.year >= trends_min_year)
-        .search(q)
-        .with_entities(Document.year, DocumentPage.content)
-    )
-    d = defaultdict(int)
+# upper bound of series per batch request, the trends page rarely has more
+stats_batch_max = 20
 
-    for r in all_results:
-        year = r.year
-        count = r.content.lower().count(counting_q)
-        d[year] += count
 
-    for year_tup in get_year_totals():
-        d[year_tup[0]] /= year_tup[1]
+def ordered_query_string_key():
+    """Cache key that keeps the order of repeated arguments, `query_string=True` sorts them."""
+    return corpus_key_prefix("view" + request.full_path)
 
-    # fix NSU
-    if q.lower() == "nsu":
-        for y in range(trends_min_year, 2009):
-            d[y] = 0
 
-    return jsonify([q, d])
+@app.route("/stats/batch")
+@single_flight_cached(ordered_query_string_key)
+def stats_batch():
+    qs = [q for q in request.args.getlist("q") if len(q) > 0]
+    if len(qs) == 0:
+        return jsonify([])
+    if len(qs) > stats_batch_max:
+        abort(400)
+    return jsonify(compute_stats(qs))
+
+
+# queries of the analysis pages worth keeping in the cache, see `warm-cache`
+popular_trends = [["nsu", "raf"], ["npd", "afd"], ["reichsbürger"], ["islamismus"]]
+popular_regional = ["vvn-bda", "reichsbürger", "antifa"]
 
 
 @app.route("/trends")
@@ -832,7 +2115,7 @@ def trends():
     qs = request.args.getlist("q")
     if len(qs) == 0 and not app.debug:
         return redirect("/trends?q=nsu&q=raf")
-    return render_template("trends.html", qs=qs)
+    return render_template("trends.html", qs=qs, stats_batch_max=stats_batch_max)
 
 
 @app.route("/regional")
@@ -885,7 +2168,7 @@ def get_search_years():
 
 
 @app.route("/suche")
-@cache.cached(query_string=True)
+@single_flight_cached(corpus_query_view_key)
 def search():
     q = request.args.get("q")
     if q is None or len(q) == 0:
@@ -893,21 +2176,30 @@ def search():
     q = cleantext.clean(q, lang="de")
     query, page, jurisdiction, max_year, min_year = build_query()
 
-    results = query.search(q, sort=True).paginate(page=page, per_page=20, error_out=True).items
-
-    # get counts for the years, only select ID for performance
-    count_sq = query.search(q).with_entities(DocumentPage.id)
-    num_results = count_sq.count()
-    counts = (
-        DocumentPage.query.with_entities(DocumentPage.id)
-        .filter(DocumentPage.id.in_(count_sq.subquery()))
-        .join(Document)
-        .group_by(Document.year)
-        .values(Document.year, func.count(DocumentPage.id))
-    )
     c_d = {}
-    for c in counts:
-        c_d[c[0]] = c[1]
+    if is_empty_search(q):
+        # the empty tsquery would match nothing, with a notice for every page
+        results, num_results = [], 0
+    else:
+        results = (
+            query.search(q, sort=True)
+            .options(*search_result_profile)
+            .paginate(page=page, per_page=20, error_out=True)
+            .items
+        )
+
+        # get counts for the years, only select ID for performance
+        count_sq = query.search(q).with_entities(DocumentPage.id)
+        num_results = count_sq.count()
+        counts = (
+            DocumentPage.query.with_entities(DocumentPage.id)
+            .filter(DocumentPage.id.in_(count_sq.subquery()))
+            .join(Document)
+            .group_by(Document.year)
+            .values(Document.year, func.count(DocumentPage.id))
+        )
+        for c in counts:
+            c_d[c[0]] = c[1]
     counts = json.dumps(c_d)
 
     tokens = (
@@ -992,7 +2284,21 @@ def download_img(filename):
 def download_file(filename):
     allowed = {"vsberichte.zip", "vsberichte-texts.zip"}
     if filename not in allowed:
-        abort(404)
+        bundle = parse_bundle(filename)
+        if bundle is None:
+            abort(404)
+        num_docs, _ = bundle_version(bundle)
+        if num_docs == 0:
+            abort(404)
+        # built by `create-zips --split`, never by a web worker
+        if not (ZIP_DIR / filename).exists():
+            resp = make_response(
+                "Das ZIP-File wird gerade erstellt, bitte in einigen Minuten erneut versuchen.",
+                503,
+            )
+            resp.headers["Retry-After"] = "600"
+            resp.headers["Content-Type"] = "text/plain; charset=utf-8"
+            return resp
     if app.debug:
         return send_from_directory(str(ZIP_DIR), filename)
     resp = make_response()
@@ -1003,6 +2309,32 @@ def download_file(filename):
     return resp
 
 
+def precompressed_response(jurisdiction, year, build, content_type):
+    """Response with the full text of a report, compressed once and cached as gzip and brotli.
+
+    Several MB per report, so only the compressed variants are stored in the cache
+    and the proxy doesn't compress the body on every request.
+    """
+    key = document_view_key(jurisdiction, year).replace("/view/", "/compressed/", 1)
+    variants = cache.get(key)
+    if variants is None:
+        d = Document.query.filter_by(
+            jurisdiction=jurisdiction.title(), year=year
+        ).first()
+        if d is None:
+            abort(404)
+        variants = compress_variants(build(d))
+        cache.set(key, variants)
+
+    encoding = choose_encoding(request.accept_encodings)
+    resp = make_response(decompress(variants) if encoding is None else variants[encoding])
+    if encoding is not None:
+        resp.headers["Content-Encoding"] = encoding
+    resp.headers["Content-Type"] = content_type
+    resp.vary.add("Accept-Encoding")
+    return resp
+
+
 # API
 
 
@@ -1016,20 +2348,114 @@ def serialize_doc(d):
     }
 
 
+def iter_page_contents(d, first=None, last=None):
+    """Texts of the pages of a report, read with a server-side cursor in small batches."""
+    query = db.session.query(DocumentPage.content).filter(
+        DocumentPage.document_id == d.id
+    )
+    if first is not None:
+        query = query.filter(DocumentPage.page_number >= first)
+    if last is not None:
+        query = query.filter(DocumentPage.page_number <= last)
+    query = query.order_by(DocumentPage.page_number).execution_options(yield_per=20)
+    return (content for (content,) in query)
+
+
+def iter_document_json(d, first=None, last=None):
+    """JSON of `serialize_doc` plus the page texts, generated chunk by chunk."""
+    res = serialize_doc(d)
+    if first is not None:
+        res["first_page"] = first
+    head = app.json.dumps(res)
+    yield head[:-1] + ', "pages": ['
+    for i, content in enumerate(iter_page_contents(d, first, last)):
+        yield ("," if i else "") + app.json.dumps(content)
+    yield "]}"
+
+
+def parse_page_range(value, num_pages):
+    """`?pages=10-20`, `?pages=10-` or `?pages=10` as first and last page number."""
+    m = re.fullmatch(r"(\d+)(?:-(\d*))?", value.strip())
+    if m is None:
+        abort(400)
+    first = int(m.group(1))
+    if m.group(2) is None:
+        last = first
+    elif m.group(2) == "":
+        last = num_pages
+    else:
+        last = int(m.group(2))
+    if first < 1 or last < first:
+        abort(400)
+    return first, min(last, num_pages)
+
+
 @app.route("/api/<jurisdiction>/<int:year>")
-@cache.cached()
 def api_details(jurisdiction, year):
-    jurisdiction = jurisdiction.title()
-    d = Document.query.filter_by(jurisdiction=jurisdiction, year=year).first()
+    page_range = request.args.get("pages")
+    if page_range is None:
+        return precompressed_response(
+            jurisdiction, year, iter_document_json, "application/json; charset=utf-8"
+        )
+
+    # only parts of the report, not cached
+    d = Document.query.filter_by(jurisdiction=jurisdiction.title(), year=year).first()
     if d is None:
         abort(404)
+    num_pages = d.num_pages
+    if num_pages is None:
+        # documents added before the page count was stored
+        num_pages = (
+            db.session.query(func.max(DocumentPage.page_number))
+            .filter(DocumentPage.document_id == d.id)
+            .scalar()
+        ) or 0
+    first, last = parse_page_range(page_range, num_pages)
+    return Response(
+        stream_with_context(iter_document_json(d, first, last)),
+        content_type="application/json; charset=utf-8",
+    )
+
+
+@app.route("/api/<jurisdiction>/<int:year>/<int:page>")
+@cache.cached(make_cache_key=document_view_key)
+def api_page(jurisdiction, year, page):
+    row = (
+        db.session.query(Document, DocumentPage)
+        .join(DocumentPage, DocumentPage.document_id == Document.id)
+        .options(*page_text_profile)
+        .filter(
+            Document.jurisdiction == jurisdiction.title(),
+            Document.year == year,
+            DocumentPage.page_number == page,
+        )
+        .first()
+    )
+    if row is None:
+        abort(404)
+    d, p = row
+
     res = serialize_doc(d)
-    res["pages"] = [x.content for x in d.pages]
+    res["page_number"] = p.page_number
+    res["content"] = p.content
+    res["images"] = {
+        "jpg": "https://verfassungsschutzberichte.de" + p.file_url,
+        "avif": "https://verfassungsschutzberichte.de"
+        + p.file_url.replace(".jpg", ".avif"),
+    }
+    # coordinates are relative to the page size, from 0 to 1
+    positions = load_word_positions(p.file_url)
+    if positions is None:
+        res["words"] = None
+    else:
+        res["page_width"] = positions["page_width"]
+        res["page_height"] = positions["page_height"]
+        res["words"] = positions["words"]
     return jsonify(res)
 
 
 @app.route("/api")
-@cache.cached()
+@cache.cached(make_cache_key=corpus_view_key)
 def api_index():
     res, total = get_index()
     for x in res:
@@ -1038,7 +2464,7 @@ def api_index():
 
 
 @app.route("/api/auto-complete")
-@cache.cached(query_string=True)
+@cache.cached(make_cache_key=corpus_query_view_key)
 def api_search_auto():
     # TODO: respect min/max year etc.
 
@@ -1093,7 +2519,7 @@ def api_search_auto():
 
 
 @app.route("/api/mentions")
-@cache.cached(query_string=True)
+@single_flight_cached(corpus_query_view_key)
 def api_mentions():
     q = request.args.get("q")
 
@@ -1104,47 +2530,38 @@ def api_mentions():
     q = cleantext.clean(q, lang="de")
     query, page, jurisdiction, max_year, min_year = build_query()
 
+    coverage = get_coverage()
     # Set default min/max years if not provided
     if min_year is None:
-        min_year = db.session.query(func.min(Document.year)).scalar()
+        min_year = coverage.min_year
     if max_year is None:
-        max_year = db.session.query(func.max(Document.year)).scalar()
-
-    # get counts for the years, only select ID for performance
-    count_sq = query.search(q).with_entities(DocumentPage.id)
-    counts = (
-        DocumentPage.query.with_entities(DocumentPage.id)
-        .filter(DocumentPage.id.in_(count_sq.subquery()))
-        .join(Document)
-        .group_by(Document.year, Document.jurisdiction)
-        .values(Document.jurisdiction, Document.year, func.count(DocumentPage.id))
-    )
+        max_year = coverage.max_year
+
+    cube = get_cube()
+    if cube is not None and q in cube:
+        counts = cube.mentions(
+            q,
+            min_year,
+            max_year,
+            None if jurisdiction is None else jurisdiction.title(),
+        )
+    else:
+        # get counts for the years, only select ID for performance
+        count_sq = query.search(q).with_entities(DocumentPage.id)
+        counts = (
+            DocumentPage.query.with_entities(DocumentPage.id)
+            .filter(DocumentPage.id.in_(count_sq.subquery()))
+            .join(Document)
+            .group_by(Document.year, Document.jurisdiction)
+            .values(Document.jurisdiction, Document.year, func.count(DocumentPage.id))
+        )
 
     results = defaultdict(lambda: defaultdict(lambda: 0))
 
     # -2: no reports were published
     # -1: we don't have the published report
-
-    for k, v in report_info["start_year"].items():
-        for y in range(min_year, max_year + 1):
-            results[k][y] = 0
-        for y in range(min_year, v):
-            results[k][y] = -2
-
-    for k, v in report_info["no_reports"].items():
-        # not sure about this?
-        for y in range(min_year, max_year + 1):
-            if (
-                results[k][y] != -2
-                and 0
-                == Document.query.filter(
-                    Document.jurisdiction == k, Document.year == y
-                ).count()
-            ):
-                results[k][y] = -1
-        for y in v:
-            if max_year >= y >= min_year:
-                results[k][y] = -2
+    for k, v in coverage.statuses(min_year, max_year).items():
+        results[k].update(v)
 
     for c in counts:
         results[c[0]][c[1]] = c[2]
@@ -1164,24 +2581,278 @@ def api_mentions():
         return jsonify(results)
 
 
+def iter_export(since=0, after=0):
+    """All documents and pages for mirrors, as dicts for NDJSON lines.
+
+    The first line has the current corpus version, pass it as `since` to only get
+    the changes after it. A `report` line lists the documents of every
+    jurisdiction and year that changed, mirrors replace their documents with
+    these, so removed ones are dropped. Then each changed document follows,
+    ordered by id, with one line per page. An interrupted export continues with
+    `after=<id of the last complete document>`.
+    """
+    yield {"type": "corpus", "version": get_corpus_version()}
+
+    changed = and_(
+        CorpusTotal.jurisdiction == Document.jurisdiction,
+        CorpusTotal.year == Document.year,
+        CorpusTotal.version > since,
+    )
+    docs = (
+        db.session.query(Document, CorpusTotal.version)
+        .join(CorpusTotal, changed)
+        .order_by(Document.id)
+        .all()
+    )
+
+    file_urls = defaultdict(list)
+    for d, _ in docs:
+        file_urls[(d.jurisdiction, d.year)].append(d.file_url)
+    for total in (
+        CorpusTotal.query.filter(CorpusTotal.version > since)
+        .order_by(CorpusTotal.jurisdiction, CorpusTotal.year)
+        .all()
+    ):
+        key = (total.jurisdiction, total.year)
+        yield {
+            "type": "report",
+            "jurisdiction": total.jurisdiction,
+            "year": total.year,
+            "version": total.version,
+            "file_urls": file_urls[key],
+        }
+
+    # one cursor over the pages of all documents, in the same order
+    pages = iter(
+        db.session.query(
+            DocumentPage.document_id, DocumentPage.page_number, DocumentPage.content
+        )
+        .join(Document)
+        .join(CorpusTotal, changed)
+        .filter(Document.id > after)
+        .order_by(DocumentPage.document_id, DocumentPage.page_number)
+        .execution_options(yield_per=100)
+    )
+    page = next(pages, None)
+    for d, version in docs:
+        if d.id <= after:
+            continue
+        res = serialize_doc(d)
+        res.update({"type": "document", "id": d.id, "version": version})
+        yield res
+        # pages of documents added while exporting are skipped
+        while page is not None and page.document_id <= d.id:
+            if page.document_id == d.id:
+                yield {
+                    "type": "page",
+                    "document_id": d.id,
+                    "page_number": page.page_number,
+                    "content": page.content,
+                }
+            page = next(pages, None)
+
+
+def parse_int_arg(name):
+    value = request.args.get(name, "0")
+    if not value.isdigit():
+        abort(400)
+    return int(value)
+
+
+@app.route("/api/export")
+def api_export():
+    since, after = parse_int_arg("since"), parse_int_arg("after")
+    lines = (app.json.dumps(x) + "\n" for x in iter_export(since, after))
+    return Response(
+        stream_with_context(lines),
+        content_type="application/x-ndjson; charset=utf-8",
+        headers={"X-Robots-Tag": "noindex, nofollow"},
+    )
+
+
 # text files
 
 
 @app.route("/<jurisdiction>-<int:year>.txt")
-@cache.cached()
 def text_details(jurisdiction, year):
-    jurisdiction = jurisdiction.title()
-    d = Document.query.filter_by(jurisdiction=jurisdiction, year=year).first()
+    d = (
+        db.session.query(Document.file_url)
+        .filter_by(jurisdiction=jurisdiction.title(), year=year)
+        .first()
+    )
     if d is None:
         abort(404)
-    return (
-        "\n\n\n".join([x.content for x in d.pages]),
-        200,
-        {
-            "Content-Type": "text/plain; charset=utf-8",
-            "X-Robots-Tag": "noindex, nofollow",
-        },
+    filename = Path(d.file_url).stem + ".txt"
+
+    if (TEXT_DIR / filename).exists():
+        if app.debug:
+            resp = send_from_directory(str(TEXT_DIR), filename)
+        else:
+            resp = make_response()
+            resp.headers["X-Accel-Redirect"] = f"/internal-texts/{filename}"
+        resp.headers["Content-Type"] = "text/plain; charset=utf-8"
+        resp.headers["X-Robots-Tag"] = "noindex, nofollow"
+        return resp
+
+    # reports added before the text files existed, see `write-texts`
+    resp = precompressed_response(
+        jurisdiction,
+        year,
+        lambda d: (
+            ("\n\n\n" if i else "") + content
+            for i, content in enumerate(iter_page_contents(d))
+        ),
+        "text/plain; charset=utf-8",
     )
+    resp.headers["X-Robots-Tag"] = "noindex, nofollow"
+    return resp
+
+
+# views whose responses only change with the code and the documents
+corpus_endpoints = {
+    "index",
+    "reports",
+    "stats",
+    "stats_batch",
+    "search",
+    "api_index",
+    "api_search_auto",
+    "api_mentions",
+    "api_export",
+}
+document_endpoints = {
+    "details",
+    "api_details",
+    "api_page",
+    "api_page_window",
+    "text_details",
+}
+
+
+def response_etag():
+    """ETag of the response for the current request, None if it doesn't depend on the corpus only."""
+    if request.endpoint in document_endpoints:
+        version = get_coverage().document_version(
+            request.view_args["jurisdiction"].title(), request.view_args["year"]
+        )
+        return f"document-{version}-{release}"
+    if request.endpoint in corpus_endpoints:
+        return f"corpus-{get_corpus_version()}-{release}"
+    return None
+
+
+# newest code or template of the release, responses also change when they do
+release_mtime = max(
+    p.stat().st_mtime
+    for p in Path(__file__).resolve().parent.rglob("*")
+    if p.suffix in (".py", ".html")
+)
+
+
+def corpus_last_modified():
+    """The later of the last corpus change and the deploy, like the ETag which has both."""
+    try:
+        mtime = max(CORPUS_VERSION_FILE.stat().st_mtime, release_mtime)
+    except FileNotFoundError:
+        mtime = release_mtime
+    return datetime.fromtimestamp(int(mtime), tz=timezone.utc)
+
+
+def record_cache(operation, result, seconds):
+    endpoint = request.endpoint if has_request_context() else None
+    metrics.record_cache(str(endpoint), operation, result, seconds)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def start_statement_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("statement_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def record_statement(conn, cursor, statement, parameters, context, executemany):
+    seconds = time.perf_counter() - conn.info["statement_start"].pop()
+    if has_request_context():
+        g.db_statements = g.get("db_statements", 0) + 1
+        g.db_seconds = g.get("db_seconds", 0) + seconds
+
+
+# resident memory is read from /proc at most this often per worker
+memory_interval = 10
+_memory_read = 0
+
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+
+@app.after_request
+def record_request(response):
+    """Per-route latency and database use, recorded after all other `after_request` functions."""
+    global _memory_read
+    if "request_start" not in g:
+        return response
+    endpoint = str(request.endpoint)
+    metrics.REQUEST_SECONDS.labels(endpoint, response.status_code).observe(
+        time.perf_counter() - g.request_start
+    )
+    metrics.DB_STATEMENTS.labels(endpoint).observe(g.get("db_statements", 0))
+    metrics.DB_SECONDS.labels(endpoint).observe(g.get("db_seconds", 0))
+
+    now = time.monotonic()
+    if now - _memory_read >= memory_interval:
+        _memory_read = now
+        memory = metrics.resident_memory()
+        if memory is not None:
+            metrics.WORKER_MEMORY.set(memory)
+    return response
+
+
+@app.route("/metrics")
+def metrics_endpoint():
+    """Metrics of all workers in the Prometheus text format, for scrapers with the METRICS_TOKEN."""
+    token = os.environ.get("METRICS_TOKEN")
+    if not app.debug:
+        if not token:
+            abort(404)
+        if not hmac.compare_digest(
+            request.headers.get("Authorization", ""), f"Bearer {token}"
+        ):
+            abort(401)
+    body, content_type = metrics.exposition()
+    resp = make_response(body)
+    resp.headers["Content-Type"] = content_type
+    return resp
+
+
+@app.before_request
+def conditional_response():
+    """Answer revalidations with 304 before the view, the cache or the database are touched."""
+    if app.debug or request.method not in ("GET", "HEAD"):
+        return None
+    etag = response_etag()
+    if etag is None:
+        return None
+    g.etag = etag
+    g.last_modified = corpus_last_modified()
+
+    if request.if_none_match:
+        # werkzeug parses `*` and lists of tags. If-None-Match compares weakly,
+        # nginx turns the ETag into a weak one when it compresses the response,
+        # and any encoding of the response is still valid.
+        not_modified = any(
+            request.if_none_match.contains_weak(etag + suffix)
+            for suffix in ("", "-gzip", "-br")
+        )
+    else:
+        not_modified = (
+            request.if_modified_since is not None
+            and g.last_modified is not None
+            and g.last_modified <= request.if_modified_since
+        )
+    if not_modified:
+        return make_response("", 304)
+    return None
 
 
 @app.after_request
@@ -1206,5 +2877,14 @@ def add_headers(response):
 
     for x in headers:
         response.headers[x[0]] = x[1]
+    if request.endpoint == "metrics_endpoint":
+        response.headers["Cache-Control"] = "no-store"
+
+    if "etag" in g and response.status_code in (200, 304):
+        # strong ETags have to differ between encodings of the same resource
+        encoding = response.headers.get("Content-Encoding")
+        response.set_etag(g.etag if encoding is None else f"{g.etag}-{encoding}")
+        if g.last_modified is not None:
+            response.last_modified = g.last_modified
 
     return response
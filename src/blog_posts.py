@@ -0,0 +1,85 @@
+"""Blog posts rendered once per process, a post is rendered again when its Markdown file changes."""
+
+from pathlib import Path
+
+import frontmatter
+import markdown
+
+
+def render_post(md_file):
+    """Metadata and HTML of a Markdown file with front matter."""
+    with open(md_file, "r", encoding="utf-8") as f:
+        post = frontmatter.load(f)
+    # Render markdown and wrap tables for responsiveness
+    html_content = markdown.markdown(
+        post.content, extensions=["fenced_code", "codehilite", "tables"]
+    )
+    # Wrap tables in a responsive container
+    html_content = html_content.replace(
+        "<table>", '<div class="table-responsive"><table>'
+    ).replace("</table>", "</table></div>")
+
+    return {
+        "title": post.get("title", ""),
+        "date": post.get("date"),
+        "tags": post.get("tags", []),
+        "slug": post.get("slug", md_file.stem),
+        "content": html_content,
+    }
+
+
+class BlogIndex:
+    """Rendered posts by slug, checked against the modification times of the files on each access."""
+
+    def __init__(self, posts_dir):
+        self.posts_dir = Path(posts_dir)
+        # file name -> (mtime, rendered post or None if it failed)
+        self._rendered = {}
+        self._stamp = None
+        self._posts = []
+        self._by_slug = {}
+        self._by_stem = {}
+
+    def _refresh(self):
+        if self.posts_dir.exists():
+            files = {f.name: f for f in self.posts_dir.glob("*.md")}
+            stamp = {name: f.stat().st_mtime_ns for name, f in files.items()}
+        else:
+            files, stamp = {}, {}
+        if stamp == self._stamp:
+            return
+
+        rendered = {}
+        for name, mtime in stamp.items():
+            if name in self._rendered and self._rendered[name][0] == mtime:
+                rendered[name] = self._rendered[name]
+                continue
+            try:
+                rendered[name] = (mtime, render_post(files[name]))
+            except Exception as e:
+                print(f"Error loading {files[name]}: {e}")
+                rendered[name] = (mtime, None)
+
+        posts = [(name, post) for name, (_, post) in rendered.items() if post is not None]
+        self._rendered = rendered
+        self._stamp = stamp
+        # Sort by date, newest first
+        self._posts = sorted(
+            (post for _, post in posts), key=lambda x: x["date"], reverse=True
+        )
+        self._by_slug = {post["slug"]: post for _, post in posts}
+        self._by_stem = {Path(name).stem: post for name, post in posts}
+
+    def posts(self):
+        self._refresh()
+        return self._posts
+
+    def get(self, slug):
+        """A post by its slug, or by the end of its file name like `2024-05-01-<slug>.md`."""
+        self._refresh()
+        if slug in self._by_slug:
+            return self._by_slug[slug]
+        for stem, post in self._by_stem.items():
+            if stem.endswith(slug):
+                return post
+        return None
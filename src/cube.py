@@ -0,0 +1,126 @@
+"""Term x jurisdiction x year counts for the analysis pages, stored as NumPy arrays.
+
+The arrays are memory-mapped read-only, so all gunicorn workers share the same
+pages of the OS page cache instead of each holding a copy.
+"""
+
+import json
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+
+META_FILE = "meta.json"
+PAGES_FILE = "pages.npy"
+OCCURRENCES_FILE = "occurrences.npy"
+
+
+class AnalyticsCube:
+    """Per term, jurisdiction and year: number of matching pages and number of occurrences."""
+
+    def __init__(self, terms, jurisdictions, years, pages, occurrences):
+        self.terms = list(terms)
+        self.jurisdictions = list(jurisdictions)
+        self.years = list(years)
+        self.pages = pages
+        self.occurrences = occurrences
+
+        self._term_index = {t: i for i, t in enumerate(self.terms)}
+        self._jurisdiction_index = {j: i for i, j in enumerate(self.jurisdictions)}
+
+    @classmethod
+    def empty(cls, terms, jurisdictions, years):
+        shape = (len(terms), len(jurisdictions), len(years))
+        return cls(
+            terms,
+            jurisdictions,
+            years,
+            np.zeros(shape, dtype=np.int32),
+            np.zeros(shape, dtype=np.int64),
+        )
+
+    def __contains__(self, term):
+        return term in self._term_index
+
+    def set(self, term, jurisdiction, year, pages, occurrences):
+        idx = (
+            self._term_index[term],
+            self._jurisdiction_index[jurisdiction],
+            year - self.years[0],
+        )
+        self.pages[idx] = pages
+        self.occurrences[idx] = occurrences
+
+    def _slice(self, array, term, jurisdiction, min_year, max_year):
+        """Counts of a term per year, summed over all or one jurisdiction."""
+        if jurisdiction is None:
+            counts = array[self._term_index[term]].sum(axis=0)
+        elif jurisdiction in self._jurisdiction_index:
+            counts = array[self._term_index[term], self._jurisdiction_index[jurisdiction]]
+        else:
+            return {}
+
+        lo = 0 if min_year is None else max(0, min_year - self.years[0])
+        hi = len(self.years) if max_year is None else max(0, max_year - self.years[0] + 1)
+        return {
+            self.years[i]: int(counts[i]) for i in range(lo, min(hi, len(self.years)))
+        }
+
+    def occurrences_by_year(self, term, jurisdiction=None, min_year=None, max_year=None):
+        return self._slice(self.occurrences, term, jurisdiction, min_year, max_year)
+
+    def pages_by_year(self, term, jurisdiction=None, min_year=None, max_year=None):
+        return self._slice(self.pages, term, jurisdiction, min_year, max_year)
+
+    def mentions(self, term, min_year, max_year, jurisdiction=None):
+        """(jurisdiction, year, pages) for every cell with at least one matching page."""
+        lo = max(0, min_year - self.years[0])
+        hi = max(lo, min(len(self.years), max_year - self.years[0] + 1))
+        pages = self.pages[self._term_index[term], :, lo:hi]
+        res = []
+        for j, i in zip(*np.nonzero(pages)):
+            if jurisdiction is None or self.jurisdictions[j] == jurisdiction:
+                res.append((self.jurisdictions[j], self.years[lo + i], int(pages[j, i])))
+        return res
+
+    def save(self, path):
+        """Write the cube to a directory, replacing an existing one atomically."""
+        path = Path(path)
+        tmp = path.with_name(path.name + ".tmp")
+        if tmp.exists():
+            shutil.rmtree(tmp)
+        tmp.mkdir(parents=True)
+
+        np.save(tmp / PAGES_FILE, self.pages)
+        np.save(tmp / OCCURRENCES_FILE, self.occurrences)
+        with open(tmp / META_FILE, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "terms": self.terms,
+                    "jurisdictions": self.jurisdictions,
+                    "years": self.years,
+                },
+                f,
+                ensure_ascii=False,
+            )
+
+        old = path.with_name(path.name + ".old")
+        if path.exists():
+            os.replace(path, old)
+        os.replace(tmp, path)
+        if old.exists():
+            shutil.rmtree(old)
+
+    @classmethod
+    def load(cls, path):
+        path = Path(path)
+        with open(path / META_FILE, encoding="utf-8") as f:
+            meta = json.load(f)
+        return cls(
+            meta["terms"],
+            meta["jurisdictions"],
+            meta["years"],
+            np.load(path / PAGES_FILE, mmap_mode="r"),
+            np.load(path / OCCURRENCES_FILE, mmap_mode="r"),
+        )
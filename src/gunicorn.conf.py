@@ -0,0 +1,8 @@
+"""Gunicorn settings, read from the working directory (/app in the container)."""
+
+from prometheus_client import multiprocess
+
+
+def child_exit(server, worker):
+    # counters of an exited worker stay in the totals, its memory gauge is dropped
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,81 @@
+"""Prometheus metrics of the web workers.
+
+With gunicorn, each worker is a process of its own. If PROMETHEUS_MULTIPROC_DIR
+is set, the workers write their values to memory-mapped files in that directory
+and `/metrics` merges the files of all workers, see the Procfile.
+"""
+
+import os
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "Time until the response of a request is returned to gunicorn",
+    ["endpoint", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+CACHE_REQUESTS = Counter(
+    "cache_requests_total",
+    "Cache reads by view, result is local (LRU of the worker), redis or miss",
+    ["endpoint", "result"],
+)
+REDIS_SECONDS = Histogram(
+    "redis_request_duration_seconds",
+    "Duration of Redis cache operations",
+    ["operation"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1),
+)
+DB_STATEMENTS = Histogram(
+    "db_statements_per_request",
+    "Number of SQL statements per request",
+    ["endpoint"],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200),
+)
+DB_SECONDS = Histogram(
+    "db_duration_seconds_per_request",
+    "Time spent in SQL statements per request",
+    ["endpoint"],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+# one series per live worker, the pid label is added in multiprocess mode
+WORKER_MEMORY = Gauge(
+    "worker_resident_memory_bytes",
+    "Resident memory of the worker",
+    multiprocess_mode="liveall",
+)
+
+
+def resident_memory():
+    """Current resident memory of this process in bytes, None where /proc is missing."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def record_cache(endpoint, operation, result, seconds):
+    if operation == "get":
+        CACHE_REQUESTS.labels(endpoint, result).inc()
+    if result != "local":
+        REDIS_SECONDS.labels(operation).observe(seconds)
+
+
+def exposition():
+    """Body and content type of the metrics of all workers."""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
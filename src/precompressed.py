@@ -0,0 +1,53 @@
+"""Large response bodies compressed once and stored as gzip and brotli variants.
+
+Only the compressed variants are kept, clients that accept neither encoding get
+the gzip variant decompressed on the fly.
+"""
+
+import gzip
+import zlib
+
+import brotli
+
+# preferred first
+ENCODINGS = ("br", "gzip")
+
+
+def compress_variants(body):
+    """All encoded variants of a response body.
+
+    The body is a str, bytes or an iterable of str/bytes chunks. Chunks are
+    compressed as they come, so the uncompressed body is never held in memory.
+    """
+    if isinstance(body, (str, bytes)):
+        body = [body]
+    # quality 9 is close to 11 in size for text at a fraction of the time
+    br = brotli.Compressor(mode=brotli.MODE_TEXT, quality=9)
+    gz = zlib.compressobj(9, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    parts = {"br": [], "gzip": []}
+    for chunk in body:
+        if isinstance(chunk, str):
+            chunk = chunk.encode("utf-8")
+        parts["br"].append(br.process(chunk))
+        parts["gzip"].append(gz.compress(chunk))
+    parts["br"].append(br.finish())
+    parts["gzip"].append(gz.flush())
+    return {encoding: b"".join(x) for encoding, x in parts.items()}
+
+
+def choose_encoding(accept_encodings):
+    """Best encoding of the variants accepted by the client, None for identity.
+
+    `accept_encodings` is werkzeug's parsed Accept-Encoding header.
+    """
+    best, best_quality = None, 0
+    for encoding in ENCODINGS:
+        quality = accept_encodings[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def decompress(variants):
+    return gzip.decompress(variants["gzip"])
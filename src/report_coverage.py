@@ -0,0 +1,105 @@
+"""Which reports exist, per jurisdiction and year."""
+
+import numpy as np
+
+# same codes as in the responses of /api/mentions
+NOT_PUBLISHED = -2
+MISSING = -1
+AVAILABLE = 0
+
+
+class Coverage:
+    """Matrix of jurisdictions x years with the number of stored documents and the report status."""
+
+    def __init__(self, documents, report_info, version=0):
+        """`documents` are (jurisdiction, year, number of documents, version of the last change) rows.
+
+        `version` is the corpus version the rows were read at.
+        """
+        self.version = version
+        start_year = report_info["start_year"]
+        self.jurisdictions = list(start_year)
+        self.first_year = min(start_year.values())
+        self.last_year = max(list(start_year.values()) + [d[1] for d in documents])
+        self._index = {j: i for i, j in enumerate(self.jurisdictions)}
+
+        index = self._index
+        shape = (len(self.jurisdictions), self.last_year - self.first_year + 1)
+        self.counts = np.zeros(shape, dtype=np.int32)
+        self.versions = np.zeros(shape, dtype=np.int32)
+        for jurisdiction, year, num_docs, doc_version in documents:
+            if jurisdiction in index and year >= self.first_year:
+                self.counts[index[jurisdiction], year - self.first_year] += num_docs
+                self.versions[index[jurisdiction], year - self.first_year] = doc_version
+
+        self.status = np.where(self.counts > 0, AVAILABLE, MISSING).astype(np.int8)
+        for jurisdiction, i in index.items():
+            self.status[i, : start_year[jurisdiction] - self.first_year] = NOT_PUBLISHED
+            for year in report_info["no_reports"].get(jurisdiction, []):
+                if self.first_year <= year <= self.last_year:
+                    self.status[i, year - self.first_year] = NOT_PUBLISHED
+
+    @property
+    def total(self):
+        return int(self.counts.sum())
+
+    @property
+    def min_year(self):
+        """Year of the oldest stored document."""
+        years = np.nonzero(self.counts.sum(axis=0))[0]
+        return None if len(years) == 0 else self.first_year + int(years[0])
+
+    @property
+    def max_year(self):
+        """Year of the newest stored document."""
+        years = np.nonzero(self.counts.sum(axis=0))[0]
+        return None if len(years) == 0 else self.first_year + int(years[-1])
+
+    def document_version(self, jurisdiction, year):
+        """Corpus version of the last change of a report, the current version if there is no report."""
+        if jurisdiction not in self._index or not self.first_year <= year <= self.last_year:
+            return self.version
+        i, j = self._index[jurisdiction], year - self.first_year
+        if self.counts[i, j] == 0:
+            return self.version
+        return int(self.versions[i, j])
+
+    def last_change(self, jurisdiction=None, min_year=None, max_year=None):
+        """Number of documents and version of the last change, in all or one jurisdiction and some years."""
+        rows = slice(None)
+        if jurisdiction is not None:
+            if jurisdiction not in self._index:
+                return 0, 0
+            rows = self._index[jurisdiction]
+        lo = 0 if min_year is None else max(0, min_year - self.first_year)
+        hi = self.counts.shape[1] if max_year is None else max(0, max_year - self.first_year + 1)
+        counts = self.counts[rows, lo:hi]
+        versions = self.versions[rows, lo:hi]
+        if versions.size == 0:
+            return 0, 0
+        return int(counts.sum()), int(versions.max())
+
+    def years(self, jurisdiction):
+        """Years of the stored documents, newest first and once per document."""
+        if jurisdiction not in self.jurisdictions:
+            return []
+        counts = self.counts[self._index[jurisdiction]]
+        return [
+            self.first_year + i
+            for i in reversed(np.nonzero(counts)[0].tolist())
+            for _ in range(counts[i])
+        ]
+
+    def statuses(self, min_year, max_year):
+        """Status of every jurisdiction in each year from `min_year` to `max_year`."""
+        res = {}
+        for i, jurisdiction in enumerate(self.jurisdictions):
+            res[jurisdiction] = {}
+            for year in range(min_year, max_year + 1):
+                if year < self.first_year:
+                    res[jurisdiction][year] = NOT_PUBLISHED
+                elif year > self.last_year:
+                    res[jurisdiction][year] = MISSING
+                else:
+                    res[jurisdiction][year] = int(self.status[i, year - self.first_year])
+        return res
@@ -132,6 +132,24 @@ function getParameterByName(name, url) {
   return decodeURIComponent(results[2].replace(/\+/g, " "));
 }
 
+// JSON of an URL, asked again while the server answers 503 because another
+// request is computing the same data
+function fetchJSON(url, retries) {
+  if (retries == null) retries = 5;
+  return fetch(url).then(function(response) {
+    if (response.status == 503 && retries > 0) {
+      var seconds = parseInt(response.headers.get("Retry-After"), 10) || 5;
+      return new Promise(function(resolve) {
+        setTimeout(resolve, seconds * 1000);
+      }).then(function() {
+        return fetchJSON(url, retries - 1);
+      });
+    }
+    if (!response.ok) throw new Error(url + ": " + response.status);
+    return response.json();
+  });
+}
+
 document.addEventListener("DOMContentLoaded", function() {
   // make sure the dummy text has at least an a4 ratio (sufficient in most cases)
   var imgs = document.getElementsByClassName("lazyload");
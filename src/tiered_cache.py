@@ -0,0 +1,227 @@
+"""Cache backend with a small LRU in each worker in front of Redis.
+
+Hot entries like the index or the stats series are then served from the
+memory of the worker, without a round trip to Redis. The LRU is emptied when
+the corpus version changes, so a worker never serves entries of an older
+corpus, and entries are kept at most `local_timeout` seconds, which bounds how
+long a value that another process deleted can still be served.
+"""
+
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from flask_caching.backends.base import BaseCache
+from flask_caching.backends.rediscache import RedisCache
+
+
+def _freeze(value):
+    """The value as kept in memory and its size in bytes.
+
+    Strings and bytes are immutable and kept as they are, everything else is
+    pickled, so a response object is never shared between requests.
+    """
+    if isinstance(value, (str, bytes)):
+        return value, len(value)
+    data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+    return data, len(data)
+
+
+class LocalCache:
+    """LRU bounded by the total size of its values."""
+
+    def __init__(self, max_bytes, max_item_bytes, timeout):
+        self.max_bytes = max_bytes
+        self.max_item_bytes = max_item_bytes
+        self.timeout = timeout
+        # key -> (expiry, size, pickled, value), least recently used first
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def size(self):
+        return self._bytes
+
+    def get(self, key):
+        """(True, value) if the key is here and has not expired, else (False, None)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            if entry[0] <= time.monotonic():
+                self._remove(key)
+                return False, None
+            self._entries.move_to_end(key)
+        _, _, pickled, value = entry
+        return True, pickle.loads(value) if pickled else value
+
+    def set(self, key, value, timeout=None):
+        """Keep a value for `timeout` seconds at most, values larger than `max_item_bytes` are not kept."""
+        try:
+            frozen, size = _freeze(value)
+        except Exception:
+            frozen, size = None, None
+        ttl = self.timeout if not timeout else min(timeout, self.timeout)
+        with self._lock:
+            self._remove(key)
+            if size is None or size > self.max_item_bytes:
+                return
+            pickled = frozen is not value
+            self._entries[key] = (time.monotonic() + ttl, size, pickled, frozen)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted, _, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+
+    def delete(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+
+
+class TieredCache(BaseCache):
+    """Reads go to the LRU of the worker first and then to Redis, writes go to both.
+
+    `version` is a callable returning the current corpus version. `observe` is
+    called with the operation, where it was answered (local, redis or miss) and
+    the seconds it took in Redis.
+    """
+
+    def __init__(
+        self, remote, local, version=None, observe=None, default_timeout=300
+    ):
+        BaseCache.__init__(self, default_timeout=default_timeout)
+        self.remote = remote
+        self.local = local
+        self.version = version
+        self.observe = observe
+        self._version = None
+        self.ignore_errors = remote.ignore_errors
+
+    @classmethod
+    def factory(cls, app, config, args, kwargs):
+        """Configured like the redis backend, plus the size and timeout of the LRU.
+
+        - CACHE_LOCAL_MAX_BYTES: memory of the LRU per worker
+        - CACHE_LOCAL_MAX_ITEM_BYTES: larger values are only stored in Redis
+        - CACHE_LOCAL_TIMEOUT: seconds a value is served from the LRU at most
+        - CACHE_VERSION: callable returning the corpus version
+        - CACHE_OBSERVE: callable to record hits, misses and the latency of Redis
+        """
+        remote = RedisCache.factory(app, config, args, dict(kwargs))
+        local = LocalCache(
+            config.get("CACHE_LOCAL_MAX_BYTES", 32 << 20),
+            config.get("CACHE_LOCAL_MAX_ITEM_BYTES", 1 << 20),
+            config.get("CACHE_LOCAL_TIMEOUT", 5 * 60),
+        )
+        return cls(
+            remote,
+            local,
+            version=config.get("CACHE_VERSION"),
+            observe=config.get("CACHE_OBSERVE"),
+            default_timeout=kwargs.get("default_timeout", 300),
+        )
+
+    def _check_version(self):
+        if self.version is None:
+            return
+        version = self.version()
+        if version != self._version:
+            self.local.clear()
+            self._version = version
+
+    def _observe(self, operation, result, start):
+        if self.observe is not None:
+            self.observe(operation, result, time.perf_counter() - start)
+
+    def get(self, key):
+        start = time.perf_counter()
+        self._check_version()
+        found, value = self.local.get(key)
+        if found:
+            self._observe("get", "local", start)
+            return value
+        start = time.perf_counter()
+        value = self.remote.get(key)
+        self._observe("get", "miss" if value is None else "redis", start)
+        if value is not None:
+            # the remaining lifetime in Redis is unknown, the local timeout bounds it
+            self.local.set(key, value)
+        return value
+
+    def has(self, key):
+        self._check_version()
+        return self.local.get(key)[0] or self.remote.has(key)
+
+    def set(self, key, value, timeout=None):
+        self._check_version()
+        timeout = self._normalize_timeout(timeout)
+        self.local.set(key, value, timeout)
+        start = time.perf_counter()
+        stored = self.remote.set(key, value, timeout=timeout)
+        self._observe("set", "redis", start)
+        return stored
+
+    def add(self, key, value, timeout=None):
+        self._check_version()
+        timeout = self._normalize_timeout(timeout)
+        added = self.remote.add(key, value, timeout=timeout)
+        if added:
+            self.local.set(key, value, timeout)
+        return added
+
+    def delete(self, key):
+        self.local.delete(key)
+        return self.remote.delete(key)
+
+    def delete_many(self, *keys):
+        for key in keys:
+            self.local.delete(key)
+        return self.remote.delete_many(*keys)
+
+    def get_many(self, *keys):
+        self._check_version()
+        values = {}
+        for key in keys:
+            found, value = self.local.get(key)
+            if found:
+                values[key] = value
+        missing = [key for key in keys if key not in values]
+        if missing:
+            for key, value in zip(missing, self.remote.get_many(*missing)):
+                values[key] = value
+                if value is not None:
+                    self.local.set(key, value)
+        return [values[key] for key in keys]
+
+    def set_many(self, mapping, timeout=None):
+        timeout = self._normalize_timeout(timeout)
+        for key, value in mapping.items():
+            self.local.set(key, value, timeout)
+        return self.remote.set_many(mapping, timeout=timeout)
+
+    def inc(self, key, delta=1):
+        self.local.delete(key)
+        return self.remote.inc(key, delta)
+
+    def dec(self, key, delta=1):
+        self.local.delete(key)
+        return self.remote.dec(key, delta)
+
+    def clear(self):
+        self.local.clear()
+        return self.remote.clear()
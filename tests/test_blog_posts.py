@@ -0,0 +1,69 @@
+"""Blog index tests (no Flask/DB required)."""
+
+import os
+from unittest.mock import patch
+
+import blog_posts
+from blog_posts import BlogIndex
+
+
+def write_post(path, slug, date, body="Text"):
+    path.write_text(
+        f"---\ntitle: {slug.title()}\ndate: {date}\nslug: {slug}\n---\n\n{body}\n",
+        encoding="utf-8",
+    )
+
+
+class TestBlogIndex:
+    """Test lookups and invalidation of the blog index."""
+
+    def test_posts_sorted_newest_first(self, tmp_path):
+        write_post(tmp_path / "2024-01-01-launch.md", "launch", "2024-01-01")
+        write_post(tmp_path / "2024-05-01-update.md", "update", "2024-05-01")
+        index = BlogIndex(tmp_path)
+        assert [p["slug"] for p in index.posts()] == ["update", "launch"]
+
+    def test_get_by_slug_and_file_name(self, tmp_path):
+        write_post(tmp_path / "2024-01-01-first-post.md", "launch", "2024-01-01", "**fett**")
+        index = BlogIndex(tmp_path)
+        assert "<strong>fett</strong>" in index.get("launch")["content"]
+        assert index.get("first-post")["slug"] == "launch"
+        assert index.get("missing") is None
+
+    def test_tables_are_responsive(self, tmp_path):
+        write_post(tmp_path / "a.md", "a", "2024-01-01", "| a | b |\n|---|---|\n| 1 | 2 |")
+        index = BlogIndex(tmp_path)
+        assert '<div class="table-responsive"><table>' in index.get("a")["content"]
+
+    def test_only_changed_files_are_rendered_again(self, tmp_path):
+        write_post(tmp_path / "a.md", "a", "2024-01-01")
+        write_post(tmp_path / "b.md", "b", "2024-01-02")
+        index = BlogIndex(tmp_path)
+
+        with patch.object(blog_posts, "render_post", wraps=blog_posts.render_post) as render:
+            index.posts()
+            assert render.call_count == 2
+            index.get("a")
+            index.posts()
+            assert render.call_count == 2
+
+            write_post(tmp_path / "b.md", "b", "2024-01-02", "Neu")
+            stat = (tmp_path / "b.md").stat()
+            os.utime(tmp_path / "b.md", ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+            assert "Neu" in index.get("b")["content"]
+            assert render.call_count == 3
+
+    def test_added_and_removed_files(self, tmp_path):
+        write_post(tmp_path / "a.md", "a", "2024-01-01")
+        index = BlogIndex(tmp_path)
+        assert index.get("b") is None
+
+        write_post(tmp_path / "b.md", "b", "2024-01-02")
+        assert index.get("b") is not None
+        (tmp_path / "a.md").unlink()
+        assert [p["slug"] for p in index.posts()] == ["b"]
+
+    def test_missing_directory(self, tmp_path):
+        index = BlogIndex(tmp_path / "missing")
+        assert index.posts() == []
+        assert index.get("launch") is None
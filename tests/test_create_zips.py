@@ -100,6 +100,8 @@ class TestCreateZips:
         with app_module.app.app_context(), \
              patch.object(app_module, "DATA_DIR", data_dir), \
              patch.object(app_module, "ZIP_DIR", zip_dir), \
+             patch.object(app_module, "TEXT_DIR", data_dir / "texts"), \
+             patch.object(app_module, "iter_page_contents", side_effect=lambda d: [p.content for p in d.pages]), \
              patch.object(app_module.Document, "query") as mock_query:
             mock_query.order_by.return_value.all.return_value = [mock_doc]
             result = runner.invoke(args=["create-zips", "--no-pdfs"])
@@ -187,6 +189,8 @@ class TestCreateZips:
         with app_module.app.app_context(), \
              patch.object(app_module, "DATA_DIR", data_dir), \
              patch.object(app_module, "ZIP_DIR", zip_dir), \
+             patch.object(app_module, "TEXT_DIR", data_dir / "texts"), \
+             patch.object(app_module, "iter_page_contents", side_effect=lambda d: [p.content for p in d.pages]), \
              patch.object(app_module.Document, "query") as mock_query:
             mock_query.order_by.return_value.all.return_value = [mock_doc1, mock_doc2]
             result = runner.invoke(args=["create-zips", "--no-pdfs"])
@@ -202,3 +206,121 @@ class TestCreateZips:
         with app.test_client() as client:
             response = client.get("/downloads/evil.zip")
             assert response.status_code == 404
+
+
+class TestPdfZipCompression:
+    """Test per-entry compression and rewriting without compressing again."""
+
+    def build(self, app_module, data_dir, *args):
+        runner = app_module.app.test_cli_runner(mix_stderr=False)
+        with patch.object(app_module, "DATA_DIR", data_dir), \
+             patch.object(app_module, "PDF_DIR", data_dir / "pdfs"), \
+             patch.object(app_module, "ZIP_DIR", data_dir / "zips"):
+            result = runner.invoke(args=["create-zips", "--no-texts", *args])
+        assert result.exit_code == 0
+        return result.output
+
+    def test_compressed_pdfs_are_stored(self, tmp_path):
+        import os
+        import app as app_module
+
+        pdf_dir = tmp_path / "pdfs"
+        pdf_dir.mkdir()
+        (pdf_dir / "compressed.pdf").write_bytes(os.urandom(100000))
+        (pdf_dir / "plain.pdf").write_bytes(b"%PDF uncompressed stream " * 10000)
+
+        self.build(app_module, tmp_path, "--workers", "2")
+
+        with zipfile.ZipFile(str(tmp_path / "zips" / "vsberichte.zip"), "r") as zf:
+            assert zf.getinfo("compressed.pdf").compress_type == zipfile.ZIP_STORED
+            assert zf.getinfo("plain.pdf").compress_type == zipfile.ZIP_DEFLATED
+            assert zf.testzip() is None
+            assert zf.read("plain.pdf") == b"%PDF uncompressed stream " * 10000
+
+    def test_removal_copies_other_entries(self, tmp_path):
+        import app as app_module
+
+        pdf_dir = tmp_path / "pdfs"
+        pdf_dir.mkdir()
+        for name in ["a", "b", "c"]:
+            (pdf_dir / f"{name}.pdf").write_bytes(f"%PDF {name} ".encode() * 10000)
+        self.build(app_module, tmp_path)
+
+        (pdf_dir / "b.pdf").unlink()
+        with patch.object(app_module, "_prepare_zip_entry") as mock_prepare:
+            output = self.build(app_module, tmp_path)
+        mock_prepare.assert_not_called()
+        assert "2 copied" in output
+
+        with zipfile.ZipFile(str(tmp_path / "zips" / "vsberichte.zip"), "r") as zf:
+            assert zf.namelist() == ["a.pdf", "c.pdf"]
+            assert zf.testzip() is None
+            assert zf.read("c.pdf") == b"%PDF c " * 10000
+
+
+class TestBundles:
+    """Test the bundles per jurisdiction and decade."""
+
+    def test_parse_bundle(self):
+        from app import parse_bundle
+        assert parse_bundle("vsberichte-by.zip") == ("Bayern", None, None, False)
+        assert parse_bundle("vsberichte-bund-texts.zip") == ("Bund", None, None, True)
+        assert parse_bundle("vsberichte-1990er.zip") == (None, 1990, 1999, False)
+        assert parse_bundle("vsberichte-1990er-texts.zip") == (None, 1990, 1999, True)
+        assert parse_bundle("vsberichte-xx.zip") is None
+        assert parse_bundle("vsberichte-1995er.zip") is None
+        assert parse_bundle("../vsberichte-by.zip") is None
+
+    def build(self, app_module, data_dir, filename, docs, version=7):
+        with app_module.app.app_context(), \
+             patch.object(app_module, "DATA_DIR", data_dir), \
+             patch.object(app_module, "PDF_DIR", data_dir / "pdfs"), \
+             patch.object(app_module, "ZIP_DIR", data_dir / "zips"), \
+             patch.object(app_module, "TEXT_DIR", data_dir / "texts"), \
+             patch.object(app_module, "bundle_version", return_value=(len(docs), version)), \
+             patch.object(app_module.Document, "query") as mock_query:
+            mock_query.filter.return_value.order_by.return_value.all.return_value = docs
+            assert app_module._build_bundle(filename)
+            assert app_module.bundle_is_current(filename, version)
+            assert not app_module.bundle_is_current(filename, version + 1)
+
+    def test_text_bundle(self, tmp_path):
+        import app as app_module
+
+        (tmp_path / "texts").mkdir()
+        (tmp_path / "texts" / "vsbericht-by-2020.txt").write_text("Bayern 2020", "utf-8")
+        doc = MagicMock(file_url="/pdfs/vsbericht-by-2020.pdf")
+
+        self.build(app_module, tmp_path, "vsberichte-by-texts.zip", [doc])
+
+        with zipfile.ZipFile(str(tmp_path / "zips" / "vsberichte-by-texts.zip"), "r") as zf:
+            assert zf.read("vsbericht-by-2020.txt") == b"Bayern 2020"
+        assert not list((tmp_path / "zips").glob("*.lock"))
+
+    def test_pdf_bundle_copies_from_full_archive(self, tmp_path):
+        import app as app_module
+
+        pdf_dir = tmp_path / "pdfs"
+        pdf_dir.mkdir()
+        for name in ["vsbericht-by-2020", "vsbericht-2020"]:
+            (pdf_dir / f"{name}.pdf").write_bytes(f"%PDF {name} ".encode() * 10000)
+        runner = app_module.app.test_cli_runner(mix_stderr=False)
+        with patch.object(app_module, "DATA_DIR", tmp_path), \
+             patch.object(app_module, "PDF_DIR", pdf_dir), \
+             patch.object(app_module, "ZIP_DIR", tmp_path / "zips"):
+            runner.invoke(args=["create-zips", "--no-texts"])
+
+        doc = MagicMock(file_url="/pdfs/vsbericht-by-2020.pdf")
+        with patch.object(app_module, "_prepare_zip_entry") as mock_prepare:
+            self.build(app_module, tmp_path, "vsberichte-by.zip", [doc])
+        mock_prepare.assert_not_called()
+
+        with zipfile.ZipFile(str(tmp_path / "zips" / "vsberichte-by.zip"), "r") as zf:
+            assert zf.namelist() == ["vsbericht-by-2020.pdf"]
+            assert zf.testzip() is None
+
+    def test_unknown_bundle_404(self):
+        from app import app
+        with app.test_client() as client:
+            response = client.get("/downloads/vsberichte-xx.zip")
+            assert response.status_code == 404
@@ -0,0 +1,57 @@
+"""Analytics cube tests (no Flask/DB required)."""
+
+from cube import AnalyticsCube
+
+
+def make_cube():
+    cube = AnalyticsCube.empty(["nsu", "raf"], ["Bund", "Bayern"], range(2010, 2013))
+    cube.set("nsu", "Bund", 2011, 3, 10)
+    cube.set("nsu", "Bayern", 2011, 1, 2)
+    cube.set("nsu", "Bayern", 2012, 2, 5)
+    return cube
+
+
+class TestAnalyticsCube:
+    """Test slicing the cube like /stats and /api/mentions do."""
+
+    def test_contains(self):
+        cube = make_cube()
+        assert "nsu" in cube
+        assert "npd" not in cube
+
+    def test_occurrences_summed_over_jurisdictions(self):
+        cube = make_cube()
+        assert cube.occurrences_by_year("nsu") == {2010: 0, 2011: 12, 2012: 5}
+
+    def test_occurrences_of_one_jurisdiction_and_years(self):
+        cube = make_cube()
+        assert cube.occurrences_by_year("nsu", "Bayern", min_year=2012) == {2012: 5}
+        assert cube.occurrences_by_year("nsu", "Bund", max_year=2010) == {2010: 0}
+
+    def test_unknown_jurisdiction(self):
+        cube = make_cube()
+        assert cube.pages_by_year("nsu", "Atlantis") == {}
+
+    def test_mentions(self):
+        cube = make_cube()
+        assert sorted(cube.mentions("nsu", 2010, 2012)) == [
+            ("Bayern", 2011, 1),
+            ("Bayern", 2012, 2),
+            ("Bund", 2011, 3),
+        ]
+        assert cube.mentions("nsu", 2012, 2020, "Bayern") == [("Bayern", 2012, 2)]
+        assert cube.mentions("nsu", 2020, 2021) == []
+        assert cube.mentions("raf", 2010, 2012) == []
+
+    def test_save_and_load_memory_mapped(self, tmp_path):
+        make_cube().save(tmp_path / "cube")
+        # saving again replaces the existing cube
+        make_cube().save(tmp_path / "cube")
+
+        cube = AnalyticsCube.load(tmp_path / "cube")
+        assert cube.terms == ["nsu", "raf"]
+        assert cube.years == [2010, 2011, 2012]
+        assert cube.occurrences_by_year("nsu", "Bund") == {2010: 0, 2011: 10, 2012: 0}
+        assert not cube.pages.flags.writeable
+        assert not (tmp_path / "cube.tmp").exists()
+        assert not (tmp_path / "cube.old").exists()
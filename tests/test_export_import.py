@@ -1,6 +1,6 @@
 """CLI command tests: export-data / import-data."""
 
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 
 
 class TestExportData:
@@ -68,6 +68,87 @@ class TestExportData:
         with tarfile.open(str(output_file), "r") as tar:
             assert tar.getnames() == ["pdfs/report.pdf"]
 
+    def test_export_writes_manifest(self, tmp_path):
+        """A manifest with size and SHA-256 of every file is written next to the archive."""
+        import hashlib
+        import json
+        import app as app_module
+
+        data_dir = tmp_path / "data"
+        (data_dir / "pdfs").mkdir(parents=True)
+        (data_dir / "pdfs" / "report.pdf").write_bytes(b"%PDF-fake")
+        output_file = tmp_path / "export.tar"
+
+        runner = app_module.app.test_cli_runner(mix_stderr=False)
+        with patch.object(app_module, "DATA_DIR", data_dir):
+            result = runner.invoke(args=["export-data", str(output_file)])
+
+        assert result.exit_code == 0
+        manifest = json.loads((tmp_path / "export.tar.manifest.json").read_text())
+        assert manifest["files"] == {
+            "pdfs/report.pdf": {
+                "size": 9,
+                "sha256": hashlib.sha256(b"%PDF-fake").hexdigest(),
+            }
+        }
+
+    def test_export_gzip(self, tmp_path):
+        """Archives ending with .tar.gz are compressed and readable by tarfile."""
+        import tarfile
+        import app as app_module
+
+        data_dir = tmp_path / "data"
+        (data_dir / "pdfs").mkdir(parents=True)
+        (data_dir / "raw" / "bund").mkdir(parents=True)
+        (data_dir / "pdfs" / "report.pdf").write_bytes(b"%PDF-fake " * 1000)
+        (data_dir / "raw" / "bund" / "report.pdf").write_bytes(b"%PDF-raw")
+        output_file = tmp_path / "export.tar.gz"
+
+        runner = app_module.app.test_cli_runner(mix_stderr=False)
+        with patch.object(app_module, "DATA_DIR", data_dir):
+            result = runner.invoke(args=["export-data", str(output_file), "--workers", "2"])
+
+        assert result.exit_code == 0
+        assert "Exported 2 PDFs" in result.output
+        assert output_file.stat().st_size < 1000
+        with tarfile.open(str(output_file), "r:gz") as tar:
+            assert tar.getnames() == ["pdfs/report.pdf", "raw/bund/report.pdf"]
+            assert tar.extractfile("pdfs/report.pdf").read() == b"%PDF-fake " * 1000
+
+    def test_export_since_manifest(self, tmp_path):
+        """Only files that are new or changed since a previous manifest are exported."""
+        import json
+        import tarfile
+        import app as app_module
+
+        data_dir = tmp_path / "data"
+        (data_dir / "pdfs").mkdir(parents=True)
+        (data_dir / "pdfs" / "a.pdf").write_bytes(b"%PDF-a")
+        (data_dir / "pdfs" / "b.pdf").write_bytes(b"%PDF-b")
+
+        runner = app_module.app.test_cli_runner(mix_stderr=False)
+        with patch.object(app_module, "DATA_DIR", data_dir):
+            runner.invoke(args=["export-data", str(tmp_path / "full.tar")])
+            (data_dir / "pdfs" / "b.pdf").write_bytes(b"%PDF-b2")
+            (data_dir / "pdfs" / "c.pdf").write_bytes(b"%PDF-c")
+            result = runner.invoke(
+                args=[
+                    "export-data",
+                    str(tmp_path / "update.tar"),
+                    "--since",
+                    str(tmp_path / "full.tar.manifest.json"),
+                ]
+            )
+
+        assert result.exit_code == 0
+        assert "Exported 2 PDFs" in result.output
+        assert "1 unchanged" in result.output
+        with tarfile.open(str(tmp_path / "update.tar"), "r") as tar:
+            assert tar.getnames() == ["pdfs/b.pdf", "pdfs/c.pdf"]
+        # the manifest describes the full state, so it can be the base of the next update
+        manifest = json.loads((tmp_path / "update.tar.manifest.json").read_text())
+        assert sorted(manifest["files"]) == ["pdfs/a.pdf", "pdfs/b.pdf", "pdfs/c.pdf"]
+
 
 class TestImportData:
     """Test the flask import-data CLI command."""
@@ -196,3 +277,181 @@ class TestImportData:
         assert (dest_data / "pdfs" / "vsbericht-bund-2020.pdf").read_bytes() == pdf_content
         assert (dest_data / "cleaned" / "bund" / "vsbericht-bund-2020.pdf").read_bytes() == pdf_content
         assert (dest_data / "raw" / "bund" / "vsbericht-bund-2020.pdf").read_bytes() == raw_content
+
+    def test_import_rejects_checksum_mismatch(self, tmp_path):
+        """Files that don't match the manifest are not written."""
+        import json
+        import app as app_module
+
+        src_data = tmp_path / "src_data"
+        (src_data / "pdfs").mkdir(parents=True)
+        (src_data / "raw").mkdir(parents=True)
+        (src_data / "pdfs" / "a.pdf").write_bytes(b"%PDF-a")
+        (src_data / "raw" / "b.pdf").write_bytes(b"%PDF-b")
+        archive_path = tmp_path / "export.tar.gz"
+
+        runner = app_module.app.test_cli_runner(mix_stderr=False)
+        with patch.object(app_module, "DATA_DIR", src_data):
+            runner.invoke(args=["export-data", str(archive_path)])
+
+        manifest_path = tmp_path / "export.tar.gz.manifest.json"
+        manifest = json.loads(manifest_path.read_text())
+        manifest["files"]["raw/b.pdf"]["sha256"] = "0" * 64
+        manifest_path.write_text(json.dumps(manifest))
+
+        dest_data = tmp_path / "dest_data"
+        with patch.object(app_module, "DATA_DIR", dest_data):
+            result = runner.invoke(args=["import-data", str(archive_path)])
+
+        assert result.exit_code == 0
+        assert "Imported 1 PDFs" in result.output
+        assert "1 PDFs failed verification: raw/b.pdf" in result.output
+        assert (dest_data / "pdfs" / "a.pdf").read_bytes() == b"%PDF-a"
+        assert list((dest_data / "raw").iterdir()) == []
+
+    def test_import_reports_missing_files(self, tmp_path):
+        """Files of the manifest that are neither in the archive nor on disk are reported."""
+        import app as app_module
+
+        src_data = tmp_path / "src_data"
+        (src_data / "pdfs").mkdir(parents=True)
+        (src_data / "pdfs" / "a.pdf").write_bytes(b"%PDF-a")
+        (src_data / "pdfs" / "b.pdf").write_bytes(b"%PDF-b")
+
+        runner = app_module.app.test_cli_runner(mix_stderr=False)
+        with patch.object(app_module, "DATA_DIR", src_data):
+            runner.invoke(args=["export-data", str(tmp_path / "full.tar")])
+            (src_data / "pdfs" / "b.pdf").write_bytes(b"%PDF-b2")
+            runner.invoke(
+                args=[
+                    "export-data",
+                    str(tmp_path / "update.tar"),
+                    "--since",
+                    str(tmp_path / "full.tar.manifest.json"),
+                ]
+            )
+
+        dest_data = tmp_path / "dest_data"
+        with patch.object(app_module, "DATA_DIR", dest_data):
+            result = runner.invoke(args=["import-data", str(tmp_path / "update.tar")])
+
+        assert result.exit_code == 0
+        assert "Imported 1 PDFs" in result.output
+        assert "1 PDFs of the manifest are missing: pdfs/a.pdf" in result.output
+
+    def test_import_ingests_extracted_pdfs(self, tmp_path):
+        """With --ingest, extracted PDFs in pdfs/ are added to the database."""
+        import app as app_module
+
+        src_data = tmp_path / "src_data"
+        (src_data / "pdfs").mkdir(parents=True)
+        (src_data / "raw" / "bund").mkdir(parents=True)
+        (src_data / "pdfs" / "vsbericht-2020.pdf").write_bytes(b"%PDF-2020")
+        (src_data / "pdfs" / "vsbericht-2021.pdf").write_bytes(b"%PDF-2021")
+        (src_data / "raw" / "bund" / "vsbericht-2020.pdf").write_bytes(b"%PDF-raw")
+        archive_path = tmp_path / "export.tar.gz"
+
+        runner = app_module.app.test_cli_runner(mix_stderr=False)
+        with patch.object(app_module, "DATA_DIR", src_data):
+            runner.invoke(args=["export-data", str(archive_path)])
+
+        dest_data = tmp_path / "dest_data"
+        with patch.object(app_module, "DATA_DIR", dest_data), patch.object(
+            app_module, "ingest_pdf"
+        ) as mock_ingest, patch.object(
+            app_module, "bump_corpus_version"
+        ) as mock_bump, patch.object(
+            app_module, "rebuild_cube"
+        ):
+            result = runner.invoke(
+                args=["import-data", str(archive_path), "--ingest", "--workers", "2"]
+            )
+
+        assert result.exit_code == 0
+        assert "Imported 3 PDFs" in result.output
+        ingested = sorted(call.args[0] for call in mock_ingest.call_args_list)
+        assert ingested == [
+            dest_data / "pdfs" / "vsbericht-2020.pdf",
+            dest_data / "pdfs" / "vsbericht-2021.pdf",
+        ]
+        mock_bump.assert_called_once()
+
+    def test_import_replaces_document_of_changed_pdf(self, tmp_path):
+        """With --ingest, the document of a PDF that changed is removed before it is added again."""
+        import app as app_module
+
+        src_data = tmp_path / "src_data"
+        (src_data / "pdfs").mkdir(parents=True)
+        (src_data / "pdfs" / "vsbericht-2020.pdf").write_bytes(b"%PDF-2020")
+        (src_data / "pdfs" / "vsbericht-2021.pdf").write_bytes(b"%PDF-2021-new")
+        archive_path = tmp_path / "export.tar"
+
+        runner = app_module.app.test_cli_runner(mix_stderr=False)
+        with patch.object(app_module, "DATA_DIR", src_data):
+            runner.invoke(args=["export-data", str(archive_path)])
+
+        dest_data = tmp_path / "dest_data"
+        (dest_data / "pdfs").mkdir(parents=True)
+        (dest_data / "pdfs" / "vsbericht-2020.pdf").write_bytes(b"%PDF-2020")
+        (dest_data / "pdfs" / "vsbericht-2021.pdf").write_bytes(b"%PDF-2021-old")
+        with patch.object(app_module, "DATA_DIR", dest_data), patch.object(
+            app_module, "ingest_pdf"
+        ) as mock_ingest, patch.object(
+            app_module, "remove_document", return_value=False
+        ) as mock_remove, patch.object(
+            app_module, "bump_corpus_version"
+        ), patch.object(
+            app_module, "rebuild_cube"
+        ):
+            result = runner.invoke(
+                args=["import-data", str(archive_path), "--ingest", "--workers", "2"]
+            )
+
+        assert result.exit_code == 0
+        assert mock_ingest.call_count == 2
+        mock_remove.assert_called_once_with("/pdfs/vsbericht-2021.pdf")
+
+    def test_extract_member_removes_temporary_file(self, tmp_path):
+        """A member that can't be read completely leaves no temporary file behind."""
+        import tarfile
+        import app as app_module
+
+        src = MagicMock()
+        src.__enter__.return_value.read.side_effect = tarfile.ReadError("truncated")
+        tar = MagicMock()
+        tar.extractfile.return_value = src
+        dest = tmp_path / "pdfs" / "a.pdf"
+
+        try:
+            app_module._extract_member(tar, "pdfs/a.pdf", dest)
+            assert False, "ReadError expected"
+        except tarfile.ReadError:
+            pass
+        assert list(dest.parent.iterdir()) == []
+
+
+class TestExportNdjson:
+    """Test the flask export-ndjson CLI command."""
+
+    def test_writes_one_line_per_record(self, tmp_path):
+        import json
+        import app as app_module
+
+        records = [
+            {"type": "corpus", "version": 7},
+            {"type": "document", "id": 1, "title": "Verfassungsschutzbericht 2020"},
+            {"type": "page", "document_id": 1, "page_number": 1, "content": "Überblick"},
+        ]
+        output_file = tmp_path / "corpus.ndjson"
+
+        runner = app_module.app.test_cli_runner(mix_stderr=False)
+        with patch.object(app_module, "iter_export", return_value=iter(records)) as mock_export:
+            result = runner.invoke(
+                args=["export-ndjson", str(output_file), "--since", "5", "--after", "3"]
+            )
+
+        assert result.exit_code == 0
+        mock_export.assert_called_once_with(5, 3)
+        lines = output_file.read_text("utf-8").splitlines()
+        assert [json.loads(line) for line in lines] == records
+        assert "Überblick" in lines[2]
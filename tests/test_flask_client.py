@@ -15,6 +15,222 @@ class TestGetIndex:
             assert isinstance(data['reports'], list)
 
 
+class TestCorpusSnapshot:
+    """Test the process-local snapshot behind get_index."""
+
+    def test_bump_corpus_version(self, tmp_path):
+        import app as app_module
+        from unittest.mock import patch
+
+        with patch.object(app_module, "DATA_DIR", tmp_path), \
+             patch.object(app_module, "CORPUS_VERSION_FILE", tmp_path / "corpus-version"):
+            assert app_module.get_corpus_version() == 0
+            assert app_module.bump_corpus_version() == 1
+            assert app_module.bump_corpus_version() == 2
+            assert app_module.get_corpus_version() == 2
+
+    def test_coverage_reused_until_version_changes(self, tmp_path):
+        import app as app_module
+        from unittest.mock import patch
+
+        with app_module.app.app_context(), \
+             patch.object(app_module, "DATA_DIR", tmp_path), \
+             patch.object(app_module, "CORPUS_VERSION_FILE", tmp_path / "corpus-version"):
+            first = app_module.get_coverage()
+            assert app_module.get_coverage() is first
+            app_module.bump_corpus_version()
+            second = app_module.get_coverage()
+            assert second is not first
+            assert second.version == first.version + 1
+
+
+    def test_rebuilt_totals_get_new_version(self, tmp_path):
+        import app as app_module
+        from unittest.mock import patch
+
+        with app_module.app.app_context(), \
+             patch.object(app_module, "DATA_DIR", tmp_path), \
+             patch.object(app_module, "CORPUS_VERSION_FILE", tmp_path / "corpus-version"):
+            (tmp_path / "corpus-version").write_text("41")
+            app_module.rebuild_corpus_totals()
+            assert app_module.get_corpus_version() == 42
+            totals = app_module.CorpusTotal.query.filter(
+                app_module.CorpusTotal.num_docs > 0
+            ).all()
+            assert all(t.version == 42 for t in totals)
+
+
+class TestCacheKeys:
+    """Test that cache keys of corpus views follow the corpus version."""
+
+    def test_corpus_keys_change_with_version(self, tmp_path):
+        import app as app_module
+        from unittest.mock import patch
+
+        with patch.object(app_module, "DATA_DIR", tmp_path), \
+             patch.object(app_module, "CORPUS_VERSION_FILE", tmp_path / "corpus-version"), \
+             app_module.app.test_request_context("/stats?q=nsu"):
+            key = app_module.corpus_query_view_key()
+            assert key == "corpus-0/view/stats?q=nsu"
+            app_module.bump_corpus_version()
+            assert app_module.corpus_query_view_key() != key
+
+    def test_query_key_ignores_argument_order(self):
+        from app import app, corpus_query_view_key
+        with app.test_request_context("/suche?q=nsu&page=2"):
+            first = corpus_query_view_key()
+        with app.test_request_context("/suche?page=2&q=nsu"):
+            assert corpus_query_view_key() == first
+
+    def test_document_key_of_missing_report_follows_corpus_version(self, tmp_path):
+        import app as app_module
+        from unittest.mock import patch
+
+        with patch.object(app_module, "DATA_DIR", tmp_path), \
+             patch.object(app_module, "CORPUS_VERSION_FILE", tmp_path / "corpus-version"), \
+             app_module.app.test_request_context("/bund/1900"):
+            key = app_module.document_view_key("bund", 1900)
+            app_module.bump_corpus_version()
+            assert app_module.document_view_key("bund", 1900) != key
+
+
+class TestLoadingProfiles:
+    """Test that metadata-only code paths don't load the text of the pages."""
+
+    def test_text_columns_deferred(self):
+        from sqlalchemy import inspect
+        from app import DocumentPage
+        attrs = inspect(DocumentPage).attrs
+        assert attrs.content.deferred
+        assert attrs.search_vector.deferred
+        assert not attrs.file_url.deferred
+
+
+class TestSingleFlightCache:
+    """Test that expensive views are computed once and served stale while refreshed."""
+
+    def make_view(self, app_module):
+        calls = []
+
+        @app_module.single_flight_cached(lambda: "view/test", timeout=60)
+        def view():
+            calls.append(1)
+            return f"result {len(calls)}"
+
+        return view, calls
+
+    def test_computed_once(self):
+        import app as app_module
+        from unittest.mock import patch
+        from flask_caching.backends.simplecache import SimpleCache
+
+        with patch.object(app_module, "cache", SimpleCache()), \
+             app_module.app.test_request_context("/stats?q=nsu"):
+            view, calls = self.make_view(app_module)
+            assert view() == "result 1"
+            assert view() == "result 1"
+            assert len(calls) == 1
+
+    def test_default_timeout_with_null_cache(self):
+        """Without a timeout, views work with the null cache of debug mode."""
+        import app as app_module
+        from unittest.mock import patch
+        from flask_caching.backends.nullcache import NullCache
+
+        calls = []
+
+        @app_module.single_flight_cached(lambda: "view/test")
+        def view():
+            calls.append(1)
+            return "result"
+
+        with patch.object(app_module, "cache", NullCache()), \
+             patch.dict(app_module.app.config), \
+             app_module.app.test_request_context("/stats?q=nsu"):
+            app_module.app.config.pop("CACHE_DEFAULT_TIMEOUT", None)
+            assert view() == "result"
+            assert view() == "result"
+            assert len(calls) == 2
+
+    def test_expired_entry_served_while_refreshing(self):
+        import app as app_module
+        from unittest.mock import patch
+        from flask_caching.backends.simplecache import SimpleCache
+
+        cache = SimpleCache()
+        with patch.object(app_module, "cache", cache), \
+             patch.object(app_module, "_refresh_in_background") as mock_refresh, \
+             app_module.app.test_request_context("/stats?q=nsu"):
+            view, calls = self.make_view(app_module)
+            cache.set("view/test", ("old result", 0, 0.5))
+            assert view() == "old result"
+            assert view() == "old result"
+            # the second request finds the lock and does not refresh again
+            mock_refresh.assert_called_once()
+            assert calls == []
+
+    def test_waits_for_other_process(self):
+        import app as app_module
+        from unittest.mock import patch
+        from flask_caching.backends.simplecache import SimpleCache
+
+        cache = SimpleCache()
+        cache.add("view/test/lock", 1)
+
+        def sleep(seconds):
+            cache.set("view/test", ("computed elsewhere", 2**40, 1.0))
+
+        with patch.object(app_module, "cache", cache), \
+             patch.object(app_module.time, "sleep", side_effect=sleep), \
+             app_module.app.test_request_context("/stats?q=nsu"):
+            view, calls = self.make_view(app_module)
+            assert view() == "computed elsewhere"
+            assert calls == []
+
+    def test_unavailable_while_other_process_computes(self):
+        import app as app_module
+        from unittest.mock import patch
+        from flask_caching.backends.simplecache import SimpleCache
+
+        cache = SimpleCache()
+        cache.add("view/test/lock", 1)
+
+        with patch.object(app_module, "cache", cache), \
+             patch.object(app_module, "single_flight_wait", 0), \
+             app_module.app.test_request_context("/stats?q=nsu"):
+            view, calls = self.make_view(app_module)
+            response = view()
+            assert response.status_code == 503
+            assert response.headers["Retry-After"] == "10"
+            assert calls == []
+
+
+class TestCubeLoading:
+    """Test that a cube replaced while loading falls back to SQL."""
+
+    def test_incomplete_cube_returns_none(self, tmp_path):
+        import app as app_module
+        from unittest.mock import patch
+
+        (tmp_path / "meta.json").write_text('{"terms": [], "jurisdictions": [], "years": []}')
+        with patch.object(app_module, "CUBE_DIR", tmp_path), \
+             patch.object(app_module, "_cube", None), \
+             patch.object(app_module, "_cube_mtime", None):
+            # the arrays are missing, as if remove_cube() ran between stat and load
+            assert app_module.get_cube() is None
+
+    def test_missing_cube_logged_once(self, tmp_path):
+        import app as app_module
+        from unittest.mock import patch
+
+        with patch.object(app_module, "CUBE_DIR", tmp_path / "cube"), \
+             patch.object(app_module, "_cube_missing_logged", False), \
+             patch.object(app_module.app.logger, "warning") as warning:
+            assert app_module.get_cube() is None
+            assert app_module.get_cube() is None
+            warning.assert_called_once()
+
+
 class TestBlogFunctions:
     """Test blog-related routes via the Flask test client."""
 
@@ -107,6 +323,137 @@ class TestNonDebugBranches:
         finally:
             app.debug = True
 
+    def test_missing_bundle_not_built_on_request(self, tmp_path):
+        """Test that a bundle `create-zips --split` has not built yet returns 503."""
+        from unittest.mock import patch
+        import app as app_module
+        from app import app
+        app.debug = False
+        try:
+            with patch.object(app_module, "ZIP_DIR", tmp_path), \
+                 patch.object(app_module, "bundle_version", return_value=(1, 1)), \
+                 patch.object(app_module, "_build_bundle") as build, \
+                 app.test_client() as client:
+                response = client.get('/downloads/vsberichte-bund-texts.zip')
+                assert response.status_code == 503
+                assert 'Retry-After' in response.headers
+                build.assert_not_called()
+        finally:
+            app.debug = True
+
+
+class TestMetrics:
+    """Test the /metrics endpoint."""
+
+    def test_records_requests(self):
+        from app import app
+        with app.test_client() as client:
+            client.get('/api')
+            response = client.get('/metrics')
+            assert response.status_code == 200
+            assert response.headers['Content-Type'].startswith('text/plain')
+            assert response.headers['Cache-Control'] == 'no-store'
+            body = response.get_data(as_text=True)
+            assert 'http_request_duration_seconds_count{endpoint="api_index",status="200"}' in body
+            assert 'db_statements_per_request_count{endpoint="api_index"}' in body
+
+    def test_token_required_in_production(self):
+        import os
+        from unittest.mock import patch
+        from app import app
+        app.debug = False
+        try:
+            with app.test_client() as client:
+                with patch.dict(os.environ, {}, clear=False):
+                    os.environ.pop('METRICS_TOKEN', None)
+                    assert client.get('/metrics').status_code == 404
+                with patch.dict(os.environ, {'METRICS_TOKEN': 'secret'}):
+                    assert client.get('/metrics').status_code == 401
+                    response = client.get(
+                        '/metrics', headers={'Authorization': 'Bearer secret'}
+                    )
+                    assert response.status_code == 200
+        finally:
+            app.debug = True
+
+
+class TestConditionalResponses:
+    """Test ETag and Last-Modified revalidation of corpus views (only when debug=False)."""
+
+    def test_api_index_etag_and_304(self):
+        from app import app
+        app.debug = False
+        try:
+            with app.test_client() as client:
+                response = client.get('/api')
+                assert response.status_code == 200
+                etag = response.headers['ETag']
+                assert etag.startswith('"corpus-')
+
+                response = client.get('/api', headers={'If-None-Match': etag})
+                assert response.status_code == 304
+                assert response.headers['ETag'] == etag
+                assert response.data == b''
+        finally:
+            app.debug = True
+
+    def test_star_weak_and_listed_etags(self):
+        from app import app
+        app.debug = False
+        try:
+            with app.test_client() as client:
+                etag = client.get('/api').headers['ETag']
+                for header in ['*', 'W/' + etag, '"corpus-outdated", ' + etag]:
+                    response = client.get('/api', headers={'If-None-Match': header})
+                    assert response.status_code == 304, header
+        finally:
+            app.debug = True
+
+    def test_stale_etag_gets_full_response(self):
+        from app import app
+        app.debug = False
+        try:
+            with app.test_client() as client:
+                response = client.get('/api', headers={'If-None-Match': '"corpus-outdated"'})
+                assert response.status_code == 200
+        finally:
+            app.debug = True
+
+    def test_last_modified_not_before_release(self, tmp_path):
+        import os
+        import app as app_module
+        from unittest.mock import patch
+
+        # the corpus changed an hour before the deploy
+        version_file = tmp_path / "corpus-version"
+        version_file.write_text("1")
+        changed = app_module.release_mtime - 3600
+        os.utime(version_file, (changed, changed))
+        with patch.object(app_module, "CORPUS_VERSION_FILE", version_file):
+            last_modified = app_module.corpus_last_modified()
+        assert last_modified.timestamp() == int(app_module.release_mtime)
+
+    def test_document_etag(self):
+        from app import app
+        app.debug = False
+        try:
+            with app.test_client() as client:
+                response = client.get('/api/bund/1900')
+                assert response.status_code == 404
+                assert 'ETag' not in response.headers
+        finally:
+            app.debug = True
+
+    def test_blog_has_no_etag(self):
+        from app import app
+        app.debug = False
+        try:
+            with app.test_client() as client:
+                response = client.get('/blog/')
+                assert 'ETag' not in response.headers
+        finally:
+            app.debug = True
+
 
 class TestSearchEdgeCases:
     """Test search edge cases for additional coverage."""
@@ -118,6 +465,21 @@ class TestSearchEdgeCases:
             response = client.get('/suche?q=xyznonexistentterm99999')
             assert response.status_code == 200
 
+    def test_search_without_words(self):
+        """Test that a query of only punctuation and operators has no results instead of an empty tsquery."""
+        import app as app_module
+        from unittest.mock import patch
+        with patch.object(app_module, "get_highlight_boxes") as boxes, \
+             app_module.app.test_client() as client:
+            for q in ['!!!', '" "', '-', 'die']:
+                response = client.get('/suche', query_string={'q': q})
+                assert response.status_code == 200
+            boxes.assert_not_called()
+        with app_module.app.app_context():
+            assert app_module.is_empty_search('!!!')
+            assert app_module.is_empty_search('die')
+            assert not app_module.is_empty_search('verfassungsschutz')
+
 
 class TestAutocompleteEdgeCases:
     """Test autocomplete edge cases for additional coverage."""
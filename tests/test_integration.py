@@ -5,9 +5,11 @@ These tests verify that HTTP endpoints work correctly after updates.
 Run with: pytest tests/
 """
 
+import json
 import pytest
 import requests
 import os
+import re
 
 
 # Test configuration
@@ -246,6 +248,35 @@ class TestDetailRoutes:
         assert response.status_code == 200
         assert 'Verfassungsschutzbericht' in response.text
 
+    def test_detail_page_shows_word_count(self):
+        """Test that the word count stored on ingest is rendered"""
+        response = requests.get(f'{BASE_URL}/bund/2020', timeout=TIMEOUT)
+        assert response.status_code == 200
+        assert re.search(r'ungefähr\s+\d+\s+Wörtern', response.text)
+
+    def test_detail_page_renders_first_window(self):
+        """Test that only the first pages are rendered, the others are loaded later"""
+        response = requests.get(f'{BASE_URL}/bund/2020', timeout=TIMEOUT)
+        assert response.status_code == 200
+        num_pages = requests.get(f'{BASE_URL}/api/bund/2020', timeout=TIMEOUT).json()['num_pages']
+        rendered = re.findall(r'class="jump" id="(\d+)"', response.text)
+        assert rendered == [str(i) for i in range(1, min(num_pages, 25) + 1)]
+        assert '/api/bund/2020/pages/' in response.text
+
+    def test_page_window(self):
+        """Test that the pages of the viewer are listed in windows"""
+        response = requests.get(f'{BASE_URL}/api/bund/2020/pages/0', timeout=TIMEOUT)
+        assert response.status_code == 200
+        pages = response.json()
+        assert pages[0]['page_number'] == 1
+        assert pages[0]['file_url'].startswith('/images/')
+        assert len(pages) <= 25
+
+    def test_page_window_404_after_last_page(self):
+        """Test that a window after the last page returns 404"""
+        response = requests.get(f'{BASE_URL}/api/bund/2020/pages/10000', timeout=TIMEOUT)
+        assert response.status_code == 404
+
     def test_detail_page_case_insensitive(self):
         """Test that jurisdiction is case-insensitive (title-cased internally)"""
         response = requests.get(f'{BASE_URL}/Bund/2020', timeout=TIMEOUT)
@@ -274,12 +305,60 @@ class TestAPIDetail:
         assert 'pages' in data
         assert isinstance(data['pages'], list)
 
+    def test_api_detail_page_range(self):
+        """Test that only the requested pages are returned"""
+        response = requests.get(
+            f'{BASE_URL}/api/bund/2020', params={'pages': '2-3'}, timeout=TIMEOUT
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data['first_page'] == 2
+        assert len(data['pages']) == 2
+
+        full = requests.get(f'{BASE_URL}/api/bund/2020', timeout=TIMEOUT).json()
+        assert data['pages'] == full['pages'][1:3]
+
+    def test_api_detail_invalid_page_range(self):
+        """Test that a malformed page range is rejected"""
+        response = requests.get(
+            f'{BASE_URL}/api/bund/2020', params={'pages': 'abc'}, timeout=TIMEOUT
+        )
+        assert response.status_code == 400
+
     def test_api_detail_404_for_missing(self):
         """Test that API detail returns 404 for non-existent report"""
         response = requests.get(f'{BASE_URL}/api/bund/1900', timeout=TIMEOUT)
         assert response.status_code == 404
 
 
+class TestAPIPage:
+    """Test the API for single pages"""
+
+    def test_api_page_returns_json(self):
+        """Test that a page has its text, images and word positions"""
+        response = requests.get(f'{BASE_URL}/api/bund/2020/2', timeout=TIMEOUT)
+        assert response.status_code == 200
+        data = response.json()
+        assert data['page_number'] == 2
+        assert data['jurisdiction'] == 'Bund'
+        assert data['images']['jpg'].endswith('_1.jpg')
+        assert data['images']['avif'].endswith('_1.avif')
+
+        full = requests.get(f'{BASE_URL}/api/bund/2020', timeout=TIMEOUT).json()
+        assert data['content'] == full['pages'][1]
+        assert 'words' in data
+
+    def test_api_page_404_for_missing_page(self):
+        """Test that a page after the last one returns 404"""
+        response = requests.get(f'{BASE_URL}/api/bund/2020/100000', timeout=TIMEOUT)
+        assert response.status_code == 404
+
+    def test_api_page_404_for_missing_report(self):
+        """Test that a page of a missing report returns 404"""
+        response = requests.get(f'{BASE_URL}/api/bund/1900/1', timeout=TIMEOUT)
+        assert response.status_code == 404
+
+
 class TestTextExport:
     """Test plain text export endpoints"""
 
@@ -289,6 +368,29 @@ class TestTextExport:
         assert response.status_code == 200
         assert 'text/plain' in response.headers.get('Content-Type', '')
 
+    def test_text_export_gzip(self):
+        """Test that the text is sent pre-compressed when the client accepts gzip"""
+        response = requests.get(
+            f'{BASE_URL}/bund-2020.txt',
+            headers={'Accept-Encoding': 'gzip'},
+            timeout=TIMEOUT
+        )
+        assert response.status_code == 200
+        assert response.headers.get('Content-Encoding') == 'gzip'
+        assert 'Accept-Encoding' in response.headers.get('Vary', '')
+        assert len(response.text) > 0
+
+    def test_text_export_identity(self):
+        """Test that clients without compression get the plain text"""
+        response = requests.get(
+            f'{BASE_URL}/bund-2020.txt',
+            headers={'Accept-Encoding': 'identity'},
+            timeout=TIMEOUT
+        )
+        assert response.status_code == 200
+        assert 'Content-Encoding' not in response.headers
+        assert len(response.content) > 0
+
     def test_text_export_404_for_missing(self):
         """Test that text export returns 404 for non-existent report"""
         response = requests.get(
@@ -299,6 +401,64 @@ class TestTextExport:
         assert response.status_code == 404
 
 
+class TestDownloadBundles:
+    """Test the ZIP bundles per jurisdiction and decade"""
+
+    def test_text_bundle_of_jurisdiction(self):
+        """Test that the texts of a jurisdiction are served once `create-zips --split` built them"""
+        response = requests.get(f'{BASE_URL}/downloads/vsberichte-bund-texts.zip', timeout=TIMEOUT)
+        assert response.status_code in (200, 503)
+        if response.status_code == 503:
+            assert 'Retry-After' in response.headers
+
+    def test_bundle_without_reports_404(self):
+        """Test that a decade without reports returns 404"""
+        response = requests.get(f'{BASE_URL}/downloads/vsberichte-1800er.zip', timeout=TIMEOUT)
+        assert response.status_code == 404
+
+    def test_unknown_bundle_404(self):
+        """Test that unknown bundle names return 404"""
+        response = requests.get(f'{BASE_URL}/downloads/vsberichte-xy-texts.zip', timeout=TIMEOUT)
+        assert response.status_code == 404
+
+
+class TestBulkExport:
+    """Test the NDJSON bulk export"""
+
+    def get_lines(self, **params):
+        response = requests.get(f'{BASE_URL}/api/export', params=params, timeout=60)
+        assert response.status_code == 200
+        assert 'application/x-ndjson' in response.headers.get('Content-Type', '')
+        return [json.loads(line) for line in response.text.splitlines()]
+
+    def test_full_export(self):
+        """Test that the export starts with the corpus version and has documents with pages"""
+        lines = self.get_lines()
+        assert lines[0]['type'] == 'corpus'
+        docs = [x for x in lines if x['type'] == 'document']
+        pages = [x for x in lines if x['type'] == 'page']
+        assert len(docs) > 0
+        assert len(pages) == sum(d['num_pages'] for d in docs)
+        assert [d['id'] for d in docs] == sorted(d['id'] for d in docs)
+
+    def test_since_current_version_is_empty(self):
+        """Test that there are no changes after the current version"""
+        version = self.get_lines()[0]['version']
+        lines = self.get_lines(since=version)
+        assert [x['type'] for x in lines] == ['corpus']
+
+    def test_resume_after_document(self):
+        """Test that an export continues after a document id"""
+        docs = [x for x in self.get_lines() if x['type'] == 'document']
+        lines = self.get_lines(after=docs[0]['id'])
+        assert [x['id'] for x in lines if x['type'] == 'document'] == [d['id'] for d in docs[1:]]
+
+    def test_invalid_since(self):
+        """Test that a non-numeric version is rejected"""
+        response = requests.get(f'{BASE_URL}/api/export', params={'since': 'abc'}, timeout=TIMEOUT)
+        assert response.status_code == 400
+
+
 class TestSearchFilters:
     """Test search with various filter parameters"""
 
@@ -362,6 +522,69 @@ class TestStatsEndpoint:
         data = response.json()
         assert data == {}
 
+    def test_stats_batch_returns_series_in_order(self):
+        """Test that the batch endpoint returns one [query, data] pair per q"""
+        response = requests.get(
+            f'{BASE_URL}/stats/batch',
+            params=[('q', 'raf'), ('q', 'nsu'), ('q', 'terror')],
+            timeout=TIMEOUT
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert [x[0] for x in data] == ['raf', 'nsu', 'terror']
+        assert all(isinstance(x[1], dict) for x in data)
+
+    def test_stats_batch_matches_single(self):
+        """Test that a batch series equals the single /stats series"""
+        single = requests.get(
+            f'{BASE_URL}/stats', params={'q': 'terror'}, timeout=TIMEOUT
+        ).json()
+        batch = requests.get(
+            f'{BASE_URL}/stats/batch',
+            params=[('q', 'nsu'), ('q', 'terror')],
+            timeout=TIMEOUT
+        ).json()
+        assert batch[1] == single
+
+    def test_stats_batch_keeps_order_of_cached_responses(self):
+        """Test that the same series in another order are not served from one cache entry"""
+        requests.get(
+            f'{BASE_URL}/stats/batch',
+            params=[('q', 'raf'), ('q', 'nsu')],
+            timeout=TIMEOUT
+        )
+        response = requests.get(
+            f'{BASE_URL}/stats/batch',
+            params=[('q', 'nsu'), ('q', 'raf')],
+            timeout=TIMEOUT
+        )
+        assert [x[0] for x in response.json()] == ['nsu', 'raf']
+
+    def test_stats_batch_no_query(self):
+        """Test that the batch endpoint without q returns an empty list"""
+        response = requests.get(f'{BASE_URL}/stats/batch', timeout=TIMEOUT)
+        assert response.status_code == 200
+        assert response.json() == []
+
+    def test_stats_batch_too_many_queries(self):
+        """Test that the batch endpoint rejects too many series"""
+        response = requests.get(
+            f'{BASE_URL}/stats/batch',
+            params=[('q', f'term{i}') for i in range(21)],
+            timeout=TIMEOUT
+        )
+        assert response.status_code == 400
+
+    def test_trends_splits_long_comparisons(self):
+        """Test that the trends page knows the batch limit and splits its requests"""
+        response = requests.get(
+            f'{BASE_URL}/trends',
+            params=[('q', f'term{i}') for i in range(25)],
+            timeout=TIMEOUT
+        )
+        assert response.status_code == 200
+        assert 'var batchMax = 20;' in response.text
+
 
 class TestAutocompleteBranches:
     """Test autocomplete endpoint edge cases"""
@@ -515,6 +738,17 @@ class TestErrorHandling:
         assert response.status_code == 404
 
 
+class TestMetricsEndpoint:
+    """Test the Prometheus metrics (no token needed in debug mode)"""
+
+    def test_metrics_format(self):
+        requests.get(f'{BASE_URL}/berichte', timeout=TIMEOUT)
+        response = requests.get(f'{BASE_URL}/metrics', timeout=TIMEOUT)
+        assert response.status_code == 200
+        assert '# TYPE http_request_duration_seconds histogram' in response.text
+        assert 'endpoint="reports"' in response.text
+
+
 class TestSQLAlchemyCompatibility:
     """Test SQLAlchemy compatibility (important for Python upgrades)"""
 
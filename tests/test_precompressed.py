@@ -0,0 +1,47 @@
+"""Pre-compressed response tests (no Flask/DB required)."""
+
+import gzip
+
+import brotli
+from werkzeug.http import parse_accept_header
+
+from precompressed import choose_encoding, compress_variants, decompress
+
+
+class TestCompressVariants:
+    """Test that all variants decode to the original body."""
+
+    def test_variants_roundtrip(self):
+        body = "Verfassungsschutzbericht\n\n\n" * 100
+        variants = compress_variants(body)
+        assert brotli.decompress(variants["br"]).decode("utf-8") == body
+        assert gzip.decompress(variants["gzip"]).decode("utf-8") == body
+        assert decompress(variants).decode("utf-8") == body
+
+    def test_chunks(self):
+        chunks = (f"Seite {i}\n" for i in range(1000))
+        variants = compress_variants(chunks)
+        expected = "".join(f"Seite {i}\n" for i in range(1000))
+        assert brotli.decompress(variants["br"]).decode("utf-8") == expected
+        assert decompress(variants).decode("utf-8") == expected
+
+    def test_bytes_body(self):
+        variants = compress_variants(b'{"pages": []}')
+        assert decompress(variants) == b'{"pages": []}'
+
+
+class TestChooseEncoding:
+    """Test content negotiation with the Accept-Encoding header."""
+
+    def test_prefers_brotli(self):
+        assert choose_encoding(parse_accept_header("gzip, deflate, br")) == "br"
+
+    def test_gzip_only(self):
+        assert choose_encoding(parse_accept_header("gzip, deflate")) == "gzip"
+
+    def test_quality_values(self):
+        assert choose_encoding(parse_accept_header("br;q=0.5, gzip")) == "gzip"
+
+    def test_identity(self):
+        assert choose_encoding(parse_accept_header("")) is None
+        assert choose_encoding(parse_accept_header("identity")) is None
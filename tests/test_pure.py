@@ -25,6 +25,57 @@ class TestCountTokens:
         assert len(result) == 0
 
 
+class TestCountNgrams:
+    """Test the count_ngrams helper function."""
+
+    def test_bigrams_and_trigrams(self):
+        from app import count_ngrams
+        result = count_ngrams(["Freie Kameradschaft Nord"])
+        assert result["freie kameradschaft"] == 1
+        assert result["kameradschaft nord"] == 1
+        assert result["freie kameradschaft nord"] == 1
+
+    def test_counts_across_pages_but_not_between_them(self):
+        from app import count_ngrams
+        result = count_ngrams(["die freie kameradschaft", "kameradschaft und"])
+        assert result["freie kameradschaft"] == 1
+        assert result["kameradschaft kameradschaft"] == 0
+
+    def test_no_ngrams_across_punctuation(self):
+        from app import count_ngrams
+        result = count_ngrams(["freie, kameradschaft"])
+        assert result["freie kameradschaft"] == 0
+
+    def test_no_substring_matches(self):
+        from app import count_ngrams
+        result = count_ngrams(["unfreie kameradschaften"])
+        assert result["freie kameradschaft"] == 0
+
+
+class TestQueryNgram:
+    """Test which trend queries are answered from n-gram counts."""
+
+    def test_phrase(self):
+        from app import query_ngram
+        assert query_ngram('"Freie Kameradschaft"') == "freie kameradschaft"
+
+    def test_single_word(self):
+        from app import query_ngram
+        assert query_ngram("nsu") is None
+
+    def test_too_long(self):
+        from app import query_ngram
+        assert query_ngram("a b c d") is None
+
+    def test_operators(self):
+        from app import query_ngram
+        assert query_ngram('"npd" or "dvu"') is None
+
+    def test_unquoted_words(self):
+        from app import query_ngram
+        assert query_ngram("npd afd") is None
+
+
 class TestSpecialPdfPreproc:
     """Test the special_pdf_preproc helper function."""
 
@@ -61,3 +112,28 @@ class TestSerializeDoc:
         assert result["jurisdiction"] == "Bund"
         assert result["file_url"] == "https://verfassungsschutzberichte.de/pdfs/test-bund-2020.pdf"
         assert result["num_pages"] == 10
+
+
+class TestParsePageRange:
+    """Test the ?pages= parameter of the API."""
+
+    def test_range(self):
+        from app import parse_page_range
+        assert parse_page_range("10-20", 100) == (10, 20)
+
+    def test_single_page(self):
+        from app import parse_page_range
+        assert parse_page_range("5", 100) == (5, 5)
+
+    def test_open_range_and_clamping(self):
+        from app import parse_page_range
+        assert parse_page_range("90-", 100) == (90, 100)
+        assert parse_page_range("90-200", 100) == (90, 100)
+
+    def test_invalid(self):
+        import pytest
+        from werkzeug.exceptions import BadRequest
+        from app import parse_page_range
+        for value in ["", "a-b", "0-3", "20-10", "-5"]:
+            with pytest.raises(BadRequest):
+                parse_page_range(value, 100)
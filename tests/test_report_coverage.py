@@ -0,0 +1,77 @@
+"""Report coverage matrix tests (no Flask/DB required)."""
+
+from report_coverage import MISSING, NOT_PUBLISHED, AVAILABLE, Coverage
+
+report_info = {
+    "start_year": {"Bund": 1968, "Hessen": 1977},
+    "no_reports": {"Bund": [1969], "Hessen": [1991, 1992]},
+}
+
+
+def make_coverage():
+    return Coverage(
+        [("Bund", 1968, 1, 1), ("Bund", 2020, 1, 3), ("Hessen", 1990, 2, 2)],
+        report_info,
+        version=3,
+    )
+
+
+class TestCoverage:
+    """Test the status of reports per jurisdiction and year."""
+
+    def test_total_and_years(self):
+        coverage = make_coverage()
+        assert coverage.total == 4
+        assert coverage.years("Bund") == [2020, 1968]
+        assert coverage.years("Hessen") == [1990, 1990]
+        assert coverage.years("Atlantis") == []
+        assert coverage.version == 3
+
+    def test_min_and_max_year(self):
+        coverage = make_coverage()
+        assert coverage.min_year == 1968
+        assert coverage.max_year == 2020
+
+    def test_document_version(self):
+        coverage = make_coverage()
+        assert coverage.document_version("Bund", 1968) == 1
+        assert coverage.document_version("Hessen", 1990) == 2
+        # reports we don't have change with every version
+        assert coverage.document_version("Bund", 1970) == 3
+        assert coverage.document_version("Bund", 2050) == 3
+        assert coverage.document_version("Atlantis", 2020) == 3
+
+    def test_last_change(self):
+        coverage = make_coverage()
+        assert coverage.last_change() == (4, 3)
+        assert coverage.last_change("Bund") == (2, 3)
+        assert coverage.last_change("Hessen") == (2, 2)
+        assert coverage.last_change(min_year=1960, max_year=1969) == (1, 1)
+        assert coverage.last_change("Hessen", 1990, 1999) == (2, 2)
+        assert coverage.last_change("Hessen", 2030, 2039) == (0, 0)
+        assert coverage.last_change("Atlantis") == (0, 0)
+
+    def test_last_change_of_removed_report(self):
+        coverage = Coverage([("Bund", 2020, 0, 5)], report_info, version=5)
+        assert coverage.last_change("Bund") == (0, 5)
+
+    def test_empty(self):
+        coverage = Coverage([], report_info)
+        assert coverage.total == 0
+        assert coverage.min_year is None
+
+    def test_statuses(self):
+        statuses = make_coverage().statuses(1968, 1992)
+        assert statuses["Bund"][1968] == AVAILABLE
+        assert statuses["Bund"][1969] == NOT_PUBLISHED
+        assert statuses["Bund"][1970] == MISSING
+        # before the first report
+        assert statuses["Hessen"][1976] == NOT_PUBLISHED
+        assert statuses["Hessen"][1990] == AVAILABLE
+        assert statuses["Hessen"][1991] == NOT_PUBLISHED
+
+    def test_statuses_outside_of_the_matrix(self):
+        statuses = make_coverage().statuses(1900, 2030)
+        assert statuses["Bund"][1900] == NOT_PUBLISHED
+        assert statuses["Bund"][2030] == MISSING
+        assert statuses["Bund"][2020] == AVAILABLE
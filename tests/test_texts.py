@@ -0,0 +1,160 @@
+"""Text file tests: writing, removing and bundling the per-report texts."""
+
+import gzip
+import zipfile
+from unittest.mock import MagicMock, patch
+
+
+class TestWriteTextFile:
+    """Test the write_text_file and remove_text_file functions."""
+
+    def test_writes_text_and_gzip(self, tmp_path):
+        import app as app_module
+
+        with patch.object(app_module, "TEXT_DIR", tmp_path):
+            app_module.write_text_file("vsbericht-2020", ["Seite 1", "Seite 2"])
+
+        assert (tmp_path / "vsbericht-2020.txt").read_text("utf-8") == "Seite 1\n\n\nSeite 2"
+        with gzip.open(tmp_path / "vsbericht-2020.txt.gz", "rt", encoding="utf-8") as f:
+            assert f.read() == "Seite 1\n\n\nSeite 2"
+        assert not list(tmp_path.glob("*.tmp"))
+
+    def test_remove(self, tmp_path):
+        import app as app_module
+
+        with patch.object(app_module, "TEXT_DIR", tmp_path):
+            app_module.write_text_file("vsbericht-2020", ["Seite 1"])
+            app_module.remove_text_file("vsbericht-2020")
+            # removing again is fine
+            app_module.remove_text_file("vsbericht-2020")
+
+        assert list(tmp_path.iterdir()) == []
+
+
+class TestTextZipFromFiles:
+    """Test that the text ZIP uses the text files instead of the pages."""
+
+    def test_text_zip_uses_text_files(self, tmp_path):
+        import app as app_module
+
+        data_dir = tmp_path / "data"
+        zip_dir = data_dir / "zips"
+        text_dir = data_dir / "texts"
+        text_dir.mkdir(parents=True)
+        (text_dir / "vsb-bund-2020.txt").write_text("Text from file", "utf-8")
+
+        mock_doc = MagicMock()
+        mock_doc.file_url = "/pdfs/vsb-bund-2020.pdf"
+        mock_doc.pages = [MagicMock(content="Text from database")]
+
+        runner = app_module.app.test_cli_runner(mix_stderr=False)
+        with app_module.app.app_context(), \
+             patch.object(app_module, "DATA_DIR", data_dir), \
+             patch.object(app_module, "ZIP_DIR", zip_dir), \
+             patch.object(app_module, "TEXT_DIR", text_dir), \
+             patch.object(app_module.Document, "query") as mock_query:
+            mock_query.order_by.return_value.all.return_value = [mock_doc]
+            result = runner.invoke(args=["create-zips", "--no-pdfs"])
+
+        assert result.exit_code == 0
+        with zipfile.ZipFile(str(zip_dir / "vsberichte-texts.zip"), "r") as zf:
+            assert zf.read("vsb-bund-2020.txt") == b"Text from file"
+
+
+class TestWriteTextsCli:
+    """Test the flask write-texts CLI command."""
+
+    def test_skips_existing_without_force(self, tmp_path):
+        import app as app_module
+
+        (tmp_path / "vsb-bund-2020.txt").write_text("old", "utf-8")
+        mock_doc = MagicMock()
+        mock_doc.file_url = "/pdfs/vsb-bund-2020.pdf"
+
+        runner = app_module.app.test_cli_runner(mix_stderr=False)
+        with app_module.app.app_context(), \
+             patch.object(app_module, "TEXT_DIR", tmp_path), \
+             patch.object(app_module, "iter_page_contents", return_value=iter(["new"])), \
+             patch.object(app_module.Document, "query") as mock_query:
+            mock_query.order_by.return_value.all.return_value = [mock_doc]
+            runner.invoke(args=["write-texts", "*"])
+            assert (tmp_path / "vsb-bund-2020.txt").read_text("utf-8") == "old"
+
+            result = runner.invoke(args=["write-texts", "*", "--force"])
+
+        assert result.exit_code == 0
+        assert (tmp_path / "vsb-bund-2020.txt").read_text("utf-8") == "new"
+
+
+class TestIncrementalTextZip:
+    """Test that the text ZIP only appends new reports when possible."""
+
+    def build(self, app_module, tmp_path, docs, force=False):
+        zip_dir = tmp_path / "zips"
+        runner = app_module.app.test_cli_runner(mix_stderr=False)
+        args = ["create-zips", "--no-pdfs"] + (["--force"] if force else [])
+        with app_module.app.app_context(), \
+             patch.object(app_module, "DATA_DIR", tmp_path), \
+             patch.object(app_module, "ZIP_DIR", zip_dir), \
+             patch.object(app_module, "TEXT_DIR", tmp_path / "texts"), \
+             patch.object(app_module.Document, "query") as mock_query:
+            mock_query.order_by.return_value.all.return_value = docs
+            result = runner.invoke(args=args)
+        assert result.exit_code == 0
+        return result.output, zip_dir / "vsberichte-texts.zip"
+
+    def make_doc(self, tmp_path, stem, text):
+        (tmp_path / "texts").mkdir(exist_ok=True)
+        (tmp_path / "texts" / f"{stem}.txt").write_text(text, "utf-8")
+        doc = MagicMock()
+        doc.file_url = f"/pdfs/{stem}.pdf"
+        return doc
+
+    def test_appends_new_reports(self, tmp_path):
+        import app as app_module
+
+        a = self.make_doc(tmp_path, "vsbericht-2019", "A")
+        b = self.make_doc(tmp_path, "vsbericht-2020", "B")
+        output, dest = self.build(app_module, tmp_path, [a])
+        assert "rebuilt" in output
+
+        output, dest = self.build(app_module, tmp_path, [a, b])
+        assert "1 new" in output
+        with zipfile.ZipFile(str(dest), "r") as zf:
+            assert zf.namelist() == ["vsbericht-2019.txt", "vsbericht-2020.txt"]
+
+        output, _ = self.build(app_module, tmp_path, [a, b])
+        assert "0 new" in output
+
+    def test_unchanged_files_are_not_hashed_again(self, tmp_path):
+        import app as app_module
+
+        a = self.make_doc(tmp_path, "vsbericht-2019", "A")
+        self.build(app_module, tmp_path, [a])
+        with patch.object(app_module, "_file_sha256") as mock_hash:
+            self.build(app_module, tmp_path, [a])
+        mock_hash.assert_not_called()
+
+    def test_rebuilds_when_report_removed(self, tmp_path):
+        import app as app_module
+
+        a = self.make_doc(tmp_path, "vsbericht-2019", "A")
+        b = self.make_doc(tmp_path, "vsbericht-2020", "B")
+        self.build(app_module, tmp_path, [a, b])
+
+        output, dest = self.build(app_module, tmp_path, [b])
+        assert "rebuilt" in output
+        with zipfile.ZipFile(str(dest), "r") as zf:
+            assert zf.namelist() == ["vsbericht-2020.txt"]
+
+    def test_rebuilds_when_text_changed(self, tmp_path):
+        import app as app_module
+
+        a = self.make_doc(tmp_path, "vsbericht-2019", "A")
+        self.build(app_module, tmp_path, [a])
+        (tmp_path / "texts" / "vsbericht-2019.txt").write_text("A, korrigiert", "utf-8")
+
+        output, dest = self.build(app_module, tmp_path, [a])
+        assert "rebuilt" in output
+        with zipfile.ZipFile(str(dest), "r") as zf:
+            assert zf.read("vsbericht-2019.txt") == "A, korrigiert".encode("utf-8")
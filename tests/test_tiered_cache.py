@@ -0,0 +1,121 @@
+"""Tiered cache tests, with an in-memory cache standing in for Redis (no Flask/DB required)."""
+
+from unittest.mock import patch
+
+from flask_caching.backends.simplecache import SimpleCache
+
+from tiered_cache import LocalCache, TieredCache
+
+
+class CountingCache(SimpleCache):
+    """SimpleCache that counts reads, to see which reads reached the remote tier."""
+
+    def __init__(self):
+        super().__init__()
+        self.reads = 0
+
+    def get(self, key):
+        self.reads += 1
+        return super().get(key)
+
+
+def make_cache(version=None, observe=None, max_bytes=1000, max_item_bytes=500, timeout=60):
+    remote = CountingCache()
+    local = LocalCache(max_bytes, max_item_bytes, timeout)
+    return TieredCache(remote, local, version=version, observe=observe), remote
+
+
+class TestLocalCache:
+    def test_evicts_least_recently_used(self):
+        local = LocalCache(max_bytes=10, max_item_bytes=10, timeout=60)
+        local.set("a", "aaaa")
+        local.set("b", "bbbb")
+        assert local.get("a") == (True, "aaaa")
+        local.set("c", "cccc")
+        assert local.get("b") == (False, None)
+        assert local.get("a")[0] and local.get("c")[0]
+        assert local.size == 8
+
+    def test_skips_large_values(self):
+        local = LocalCache(max_bytes=100, max_item_bytes=5, timeout=60)
+        local.set("a", "x" * 6)
+        assert len(local) == 0
+
+    def test_expires(self):
+        local = LocalCache(max_bytes=100, max_item_bytes=100, timeout=60)
+        with patch("tiered_cache.time.monotonic", return_value=1000):
+            local.set("a", "x", timeout=10)
+        with patch("tiered_cache.time.monotonic", return_value=1009):
+            assert local.get("a") == (True, "x")
+        with patch("tiered_cache.time.monotonic", return_value=1010):
+            assert local.get("a") == (False, None)
+        assert local.size == 0
+
+    def test_mutable_values_are_copies(self):
+        local = LocalCache(max_bytes=1000, max_item_bytes=1000, timeout=60)
+        local.set("a", {"years": [2020]})
+        local.get("a")[1]["years"].append(2021)
+        assert local.get("a") == (True, {"years": [2020]})
+
+
+class TestTieredCache:
+    def test_reads_remote_once(self):
+        cache, remote = make_cache()
+        remote.set("corpus-1/view/berichte", "<html>")
+        assert cache.get("corpus-1/view/berichte") == "<html>"
+        assert cache.get("corpus-1/view/berichte") == "<html>"
+        assert remote.reads == 1
+
+    def test_writes_both_tiers(self):
+        cache, remote = make_cache()
+        cache.set("corpus-1/total_years", [(2020, 100)])
+        assert remote.get("corpus-1/total_years") == [(2020, 100)]
+        remote.reads = 0
+        assert cache.get("corpus-1/total_years") == [(2020, 100)]
+        assert remote.reads == 0
+
+    def test_misses_are_not_kept(self):
+        cache, remote = make_cache()
+        assert cache.get("missing") is None
+        remote.set("missing", "now there")
+        assert cache.get("missing") == "now there"
+
+    def test_cleared_when_corpus_version_changes(self):
+        version = [1]
+        cache, remote = make_cache(version=lambda: version[0])
+        cache.set("view/impressum", "old")
+        remote.set("view/impressum", "new")
+        assert cache.get("view/impressum") == "old"
+        version[0] = 2
+        assert cache.get("view/impressum") == "new"
+
+    def test_delete(self):
+        cache, remote = make_cache()
+        cache.set("corpus-1/ngrams_complete", True)
+        cache.delete("corpus-1/ngrams_complete")
+        assert cache.get("corpus-1/ngrams_complete") is None
+        assert not cache.has("corpus-1/ngrams_complete")
+
+    def test_get_many(self):
+        cache, remote = make_cache()
+        cache.set("a", "1")
+        remote.set("b", "2")
+        assert cache.get_many("a", "b", "c") == ["1", "2", None]
+        remote.reads = 0
+        assert cache.get_many("a", "b") == ["1", "2"]
+        assert remote.reads == 0
+
+    def test_observe(self):
+        observed = []
+        cache, remote = make_cache(observe=lambda *x: observed.append(x[:2]))
+        cache.get("a")
+        cache.set("a", "1")
+        cache.get("a")
+        remote.set("b", "2")
+        cache.get("b")
+        assert observed == [
+            ("get", "miss"),
+            ("set", "redis"),
+            ("get", "local"),
+            ("get", "redis"),
+        ]
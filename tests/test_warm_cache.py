@@ -0,0 +1,44 @@
+"""CLI command tests: warm-cache."""
+
+from unittest.mock import patch
+
+
+class TestWarmCache:
+    """Test the flask warm-cache CLI command."""
+
+    def test_urls_without_documents(self):
+        """The static pages and popular analysis queries should always be warmed."""
+        import app as app_module
+
+        urls = app_module.warm_cache_urls(documents=False)
+        assert "/" in urls
+        assert "/berichte" in urls
+        assert app_module.index_stats_url in urls
+        assert "/trends?q=nsu&q=raf" in urls
+        assert "/stats/batch?q=nsu&q=raf" in urls
+        assert "/regional?q=vvn-bda" in urls
+        assert not any(u.startswith("/api/bund/") for u in urls)
+
+    def test_urls_are_quoted_like_javascript(self):
+        """Non-ASCII queries should be percent-encoded like encodeURIComponent."""
+        import app as app_module
+
+        with patch.object(app_module, "popular_trends", [["reichsbürger"]]):
+            urls = app_module.warm_cache_urls(documents=False)
+        assert "/stats/batch?q=reichsb%C3%BCrger" in urls
+
+    def test_renders_urls_and_reports_timings(self):
+        """Every URL should be requested and timings grouped by endpoint."""
+        import app as app_module
+
+        runner = app_module.app.test_cli_runner(mix_stderr=False)
+        with patch.object(
+            app_module, "warm_cache_urls", return_value=["/impressum", "/blog/"]
+        ):
+            result = runner.invoke(args=["warm-cache", "--workers", "2"])
+
+        assert result.exit_code == 0
+        assert "200" in result.output
+        assert "Warmed 2 URLs" in result.output
+        assert "impressum: 1 URLs" in result.output
+        assert "blog_index: 1 URLs" in result.output
@@ -178,6 +178,26 @@ class TestGetHighlightBoxes:
         assert len(boxes) == 1
 
 
+class TestLoadWordPositions:
+    """Test the load_word_positions function."""
+
+    def test_loads_page(self, tmp_path):
+        import app as app_module
+
+        data = {"page_width": 595.0, "page_height": 842.0, "words": [{"t": "NSU"}]}
+        with gzip.open(tmp_path / "vsbericht-2020_3.json.gz", "wt", encoding="utf-8") as f:
+            f.write(json.dumps(data))
+
+        with patch.object(app_module, "WORDPOS_DIR", tmp_path):
+            assert app_module.load_word_positions("/images/vsbericht-2020_3.jpg") == data
+
+    def test_missing_file_returns_none(self, tmp_path):
+        import app as app_module
+
+        with patch.object(app_module, "WORDPOS_DIR", tmp_path):
+            assert app_module.load_word_positions("/images/vsbericht-2020_3.jpg") is None
+
+
 class TestExtractWordposCli:
     """Test the extract-wordpos CLI command."""
 